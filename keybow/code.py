@@ -1,6 +1,12 @@
-from src.macro_pad import MacroPad
+from src.profiler import boot_timer
 
 
-macro_pad = MacroPad()
+with boot_timer.measure("import src.macro_pad"):
+    from src.macro_pad import MacroPad
+
+with boot_timer.measure("MacroPad"):
+    macro_pad = MacroPad()
+boot_timer.report()
+
 while True:
     macro_pad.update()
@@ -0,0 +1,54 @@
+LIVE_FRAME = 0
+IDLE_FRAME = 7
+# frames 1 to 6 hold the colors of the first layers, others use the live frame
+LAYER_FRAMES = range(1, IDLE_FRAME)
+
+
+class FrameAnimator:
+    """
+    Uses the 8 frames of the IS31FL3731: layer colors and the dimmed idle colors
+    are written to their own frame once, so that changing layer, going to sleep
+    and waking up are a single register write.
+    While asleep, the idle frame breathes on the chip, without any I2C traffic.
+
+    :param idle_brightness: scale of the colors shown while asleep
+    :param breathing: (fade in, fade out, extinguish) times in ms of the idle
+        breathing, None to disable it
+    """
+
+    def __init__(self, pixels, idle_brightness=0.1, breathing=(1000, 1000, 200)):
+        self.pixels = pixels
+        self.idle_brightness = idle_brightness
+        self.breathing = breathing
+        self.asleep = False
+
+    def layer_frame(self, layer):
+        return layer.idx if layer.idx in LAYER_FRAMES else LIVE_FRAME
+
+    def load_layer(self, layer, colors):
+        # colors: (r, g, b) of each key idx
+        frame = self.layer_frame(layer)
+        if frame != LIVE_FRAME:
+            self.pixels.load_frame(frame, colors)
+
+    def show_layer(self, layer):
+        self.pixels.select_frame(self.layer_frame(layer))
+
+    def show_live(self):
+        self.pixels.select_frame(LIVE_FRAME)
+
+    def sleep(self):
+        # LED changes made while asleep still go to the awake frame
+        pixels = self.pixels
+        pixels.copy_frame(pixels.frame(), IDLE_FRAME, self.idle_brightness)
+        if self.breathing is not None:
+            pixels.breathe(*self.breathing)
+        pixels.display_frame(IDLE_FRAME)
+        self.asleep = True
+
+    def wake(self):
+        pixels = self.pixels
+        if self.breathing is not None:
+            pixels.breathe(None)
+        pixels.display_frame(pixels.frame())
+        self.asleep = False
@@ -1,32 +1,47 @@
 import board
-import usb_hid
-from adafruit_hid.consumer_control import ConsumerControl
-from adafruit_hid.consumer_control_code import ConsumerControlCode
-from adafruit_hid.keyboard import Keyboard
-from adafruit_hid.keyboard_layout_us import KeyboardLayoutUS
-from adafruit_hid.keycode import Keycode
-from src.control import HIDAction, IRAction, IRLayer, KeyboardLayer
-from src.ir_remotes.remote import BenQ, Feintech, Lumene, Tangent
+from src.control import HIDAction, IRAction, IRLayer, KeyboardLayer, LazyLayer
+from src.utils import lazy
 
 
-# Set up the keyboard and layout
-keyboard = Keyboard(usb_hid.devices)
-layout = KeyboardLayoutUS(keyboard)
-
-# Set up consumer control (used to send media key presses)
-consumer_control = ConsumerControl(usb_hid.devices)
+# build layers, and their devices and remotes, when first selected instead of at
+# boot: boot is faster, but the first selection of each layer is slower
+LAZY_LAYERS = False
 
 ir_pin = board.INT
 
-benq = BenQ(ir_pin)
-lumene = Lumene(ir_pin)
-sonos = Tangent(ir_pin)
-feintech = Feintech(ir_pin)
 
+@lazy
+def get_keyboard():
+    import usb_hid
+    from adafruit_hid.keyboard import Keyboard
 
-layers = [
-    KeyboardLayer(
-        name="Kodi",
+    return Keyboard(usb_hid.devices)
+
+
+@lazy
+def get_layout():
+    from adafruit_hid.keyboard_layout_us import KeyboardLayoutUS
+
+    return KeyboardLayoutUS(get_keyboard())
+
+
+@lazy
+def get_consumer_control():
+    # used to send media key presses
+    import usb_hid
+    from adafruit_hid.consumer_control import ConsumerControl
+
+    return ConsumerControl(usb_hid.devices)
+
+
+def kodi_layer(name, rgb):
+    from adafruit_hid.consumer_control_code import ConsumerControlCode
+    from adafruit_hid.keycode import Keycode
+
+    keyboard = get_keyboard()
+    consumer_control = get_consumer_control()
+    return KeyboardLayer(
+        name=name,
         key_map={
             (2, 3): HIDAction(
                 consumer_control, ConsumerControlCode.VOLUME_DECREMENT, chr(57860)
@@ -52,22 +67,35 @@ layers = [
             (3, 2): HIDAction(keyboard, Keycode.BACKSPACE, "\u232B"),
             (0, 3): HIDAction(keyboard, Keycode.ESCAPE, "Esc"),
         },
-        rgb=(255, 0, 255),
+        rgb=rgb,
         keyboard=keyboard,
         consumer_control=consumer_control,
-    ),
-    IRLayer(
-        name="Sonos",
+    )
+
+
+def sonos_layer(name, rgb):
+    from src.ir_remotes.remote import Tangent
+
+    sonos = Tangent(ir_pin)
+    return IRLayer(
+        name=name,
         key_map={
             # configured to mute Sonos
             (1, 3): IRAction(sonos, Tangent.Code.KEY_ENTER, chr(57858)),
             (2, 3): IRAction(sonos, Tangent.Code.VOLUME_DECREMENT, chr(57860)),
             (3, 3): IRAction(sonos, Tangent.Code.VOLUME_INCREMENT, chr(57859)),
         },
-        rgb=(0, 255, 255),
-    ),
-    IRLayer(
-        name="Videoproj",
+        rgb=rgb,
+    )
+
+
+def videoproj_layer(name, rgb):
+    from src.ir_remotes.remote import BenQ, Lumene
+
+    benq = BenQ(ir_pin)
+    lumene = Lumene(ir_pin)
+    return IRLayer(
+        name=name,
         key_map={
             (1, 3): IRAction(benq, BenQ.Code.MUTE, chr(57858)),
             (2, 3): IRAction(benq, BenQ.Code.VOLUME_DECREMENT, chr(57860)),
@@ -78,10 +106,16 @@ layers = [
             (0, 3): IRAction(lumene, Lumene.Code.STOP, chr(57433)),
             (0, 2): IRAction(lumene, Lumene.Code.UP, chr(57440)),
         },
-        rgb=(255, 255, 0),
-    ),
-    IRLayer(
-        name="Feintech",
+        rgb=rgb,
+    )
+
+
+def feintech_layer(name, rgb):
+    from src.ir_remotes.remote import Feintech
+
+    feintech = Feintech(ir_pin)
+    return IRLayer(
+        name=name,
         key_map={
             (1, 0): IRAction(feintech, Feintech.Code.ONE, chr(57706)),
             (2, 0): IRAction(feintech, Feintech.Code.TWO, chr(57707)),
@@ -92,6 +126,15 @@ layers = [
             (1, 2): IRAction(feintech, Feintech.Code.ON, "ON"),
             (3, 2): IRAction(feintech, Feintech.Code.OFF, "OFF"),
         },
-        rgb=(255, 90, 70),
-    ),
+        rgb=rgb,
+    )
+
+
+layers = [
+    LazyLayer("Kodi", (255, 0, 255), kodi_layer),
+    LazyLayer("Sonos", (0, 255, 255), sonos_layer),
+    LazyLayer("Videoproj", (255, 255, 0), videoproj_layer),
+    LazyLayer("Feintech", (255, 90, 70), feintech_layer),
 ]
+if not LAZY_LAYERS:
+    layers = [layer.build() for layer in layers]
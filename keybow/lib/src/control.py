@@ -2,6 +2,10 @@ import time
 
 from adafruit_hid.consumer_control import ConsumerControl
 from adafruit_hid.keyboard import Keyboard
+from src.hid import get_report
+from src.macro import compile_steps, macro_runner
+from src.profiler import boot_timer
+from src.utils import iter_bits
 
 
 class Layer:
@@ -9,6 +13,40 @@ class Layer:
         self.name = name
         self.key_map = key_map
         self.rgb = rgb
+        # action of each key idx, None for unmapped keys
+        self.actions = []
+        self.key_mask = 0
+        # position in the keybow event queue
+        self.cursor = 0
+
+    def bind(self, keybow):
+        """
+        Compile the key map into flat tables indexed by key idx, so that the main
+        loop never goes through the key map again
+        """
+        self.keybow = keybow
+        self.actions = [None] * len(keybow.keys)
+        self.key_mask = 0
+        for key_idx, action in self.key_map.items():
+            key = keybow.keys[key_idx]
+            self.actions[key.idx] = action
+            self.key_mask |= key.mask
+
+        # LED colors and screen labels, by key idx
+        self.colors = tuple(
+            (0, 0, 0) if action is None else self.rgb for action in self.actions
+        )
+        self.labels = tuple(
+            " " if action is None else action.label for action in self.actions
+        )
+        self.skip_events()
+
+    def pending_events(self):
+        events, self.cursor = self.keybow.events.read(self.cursor)
+        return events
+
+    def skip_events(self):
+        self.cursor = self.keybow.events.head
 
     def clear(self):
         pass
@@ -17,8 +55,32 @@ class Layer:
         pass
 
 
+class LazyLayer:
+    """
+    Placeholder of a layer, built by `factory(name, rgb)` when first selected, so
+    that its devices and remotes are only created if it is used.
+    Its IR codes, glyphs and screen are then prepared by MacroPad.prepare_layer,
+    so the first selection takes longer than the next ones.
+    """
+
+    key_map = {}
+    labels = ()
+
+    def __init__(self, name, rgb, factory):
+        self.name = name
+        self.rgb = rgb
+        self.factory = factory
+
+    def build(self):
+        return self.factory(name=self.name, rgb=self.rgb)
+
+    def clear(self):
+        pass
+
+
 class LayerHandler:
     def __init__(self, macro_pad):
+        self.macro_pad = macro_pad
         self.keybow = macro_pad.keybow
         self.screen = macro_pad.screen
         self.selector_gen = ((x, y) for y in range(4) for x in range(4))
@@ -31,6 +93,7 @@ class LayerHandler:
         @self.selector_key.on_event("held")
         def layer_selector(key):
             self.current_layer = None
+            self.keybow.animator.show_live()
             for _key in self.keybow.keys:
                 _key.lit = False
 
@@ -44,121 +107,187 @@ class LayerHandler:
         self.layers.append(layer)
         layer.idx = len(self.layers)
         layer.selector = self.keybow.keys[next(self.selector_gen)]
-        layer.keybow = self.keybow
+        layer.screen = self.screen
+        if not isinstance(layer, LazyLayer):
+            self.compile_layer(layer)
+
+        idx = layer.idx
 
         @layer.selector.on_event("tapped")
         def _select_layer(key):
             if not self.selector_key.held:
                 return
 
-            if not any(_key.tapped for _key in self.keybow.keys if _key != key):
-                self.select_layer(layer)
+            if not self.keybow.tapped_mask & ~key.mask:
+                # lazy layers are replaced once built
+                self.select_layer(self.layers[idx - 1])
+
+    def compile_layer(self, layer):
+        layer.bind(self.keybow)
+        self.keybow.animator.load_layer(layer, layer.colors)
+
+    def build_layer(self, lazy_layer):
+        # the layer startup work happens here, on its first selection
+        with boot_timer.measure(f"layer {lazy_layer.name}"):
+            layer = lazy_layer.build()
+            layer.idx = lazy_layer.idx
+            layer.selector = lazy_layer.selector
+            layer.screen = self.screen
+            self.compile_layer(layer)
+            self.macro_pad.prepare_layer(layer)
+        self.layers[layer.idx - 1] = layer
+        return layer
 
     def add(self, *layers):
         for layer in layers:
             self.add_single(layer)
 
     def select_layer(self, layer):
-        for key in set(self.keybow.keys) - {
-            self.keybow.keys[idx] for idx in layer.key_map
-        }:
-            key.lit = False
+        if isinstance(layer, LazyLayer):
+            layer = self.build_layer(layer)
 
-        for key_idx in layer.key_map:
-            self.keybow.keys[key_idx].lit = layer.rgb
+        # the layer frame already holds these colors, only key states change
+        self.keybow.animator.show_layer(layer)
+        for key in self.keybow.keys:
+            key.lit = layer.rgb if layer.key_mask & key.mask else False
 
-        self.screen.show_key_map(layer.name, layer.key_map)
+        self.screen.show_layer(layer)
+        layer.skip_events()
         self.current_layer = layer
 
 
 class IRLayer(Layer):
-    def __init__(self, *args, debounce=0.2, **kwargs):
+    def __init__(self, *args, debounce=0.0, repeat_period=0.2, **kwargs):
         super().__init__(*args, **kwargs)
+        # keys are debounced by the keybow, this only throttles new presses
         self.debounce = debounce
+        # resend period of held keys, for protocols without a native repeat rate
+        self.repeat_period = repeat_period
+
+        # key idx -> action, of the keys currently pressed
+        self.pressed_actions = {}
+        # actions that sent a full frame, repeat codes are only valid after one
+        self.framed_actions = set()
+
+    def clear(self):
+        self.pressed_actions.clear()
+        self.framed_actions.clear()
+
+    def repeating(self, action, now):
+        """
+        Whether a repeat code still follows the last frame of the action: held keys
+        send one about every repeat period, a longer gap needs a new frame
+        """
+        return action in self.framed_actions and now - action.last_time_sent <= 2 * (
+            action.repeat_period or self.repeat_period
+        )
+
+    def send(self, action, now):
+        action.last_time_sent = now
+        self.framed_actions.add(action)
+        action.send()
 
     def update(self):
         now = time.monotonic()
-        for key_idx, action in self.key_map.items():
-            if (
-                self.keybow.keys[key_idx].pressed
-                and now - action.last_time_sent > self.debounce
+        for key_idx, event, _ in self.pending_events():
+            if event == "pressed" and self.key_mask & (1 << key_idx):
+                action = self.actions[key_idx]
+                self.pressed_actions[key_idx] = action
+                # a press within the debounce time is treated as a hold
+                if now - action.last_time_sent < self.debounce:
+                    if self.repeating(action, now):
+                        continue
+                self.send(action, now)
+
+            elif event == "released":
+                self.pressed_actions.pop(key_idx, None)
+
+        # held keys: use the protocol repeat code, at its native rate if any
+        for action in self.pressed_actions.values():
+            if now - action.last_time_sent > (
+                action.repeat_period or self.repeat_period
             ):
-                action.last_time_sent = now
-                action.send()
+                if self.repeating(action, now):
+                    action.last_time_sent = now
+                    action.repeat()
+                else:
+                    self.send(action, now)
+
+
+class DebugLayer(Layer):
+    """
+    Shows the main loop timings of the profiler on the screen
+    """
+
+    def __init__(self, profiler, name="Debug", rgb=(255, 255, 255), refresh=1.0):
+        super().__init__(name=name, key_map={}, rgb=rgb)
+        self.profiler = profiler
+        self.refresh = refresh
+        self.last_refresh = time.monotonic()
+
+    def update(self):
+        now = time.monotonic()
+        if now - self.last_refresh > self.refresh:
+            self.last_refresh = now
+            self.screen.show_lines(self.profiler.report(limit=6))
 
 
 class KeyboardLayer(Layer):
+    """
+    Keys are held on the host as long as they are pressed.
+    Reports are only sent when the pressed keys change, see src.hid.
+    """
+
     def __init__(self, *args, keyboard, consumer_control, **kwargs):
         self.keyboard = keyboard
         self.consumer_control = consumer_control
+        self.keyboard_report = get_report(keyboard)
+        self.consumer_control_report = get_report(consumer_control)
+        # layer keys pressed at the last update
+        self.pressed_mask = 0
         super().__init__(*args, **kwargs)
 
-    @property
-    def keycodes(self):
-        return {
-            action.code
-            for action in self.key_map.values()
-            if isinstance(action.hardware, Keyboard)
-        }
-
-    @property
-    def consumer_control_codes(self):
-        return {
-            action.code
-            for action in self.key_map.values()
-            if isinstance(action.hardware, ConsumerControl)
-        }
-
-    def clear_keyboard(self):
-        if any(self.keyboard.report):
-            self.keyboard.release_all()
-
-    def clear_consumer_control(self):
-        if any(self.consumer_control._report):
-            self.consumer_control.release()
+    def bind(self, keybow):
+        super().bind(keybow)
+        # keys sending to each device, and their codes
+        self.keyboard_mask = self.consumer_control_mask = self.macro_mask = 0
+        for key_idx, action in enumerate(self.actions):
+            if action is None:
+                continue
+            if isinstance(action, MacroAction):
+                self.macro_mask |= 1 << key_idx
+            elif isinstance(action.hardware, Keyboard):
+                self.keyboard_mask |= 1 << key_idx
+            elif isinstance(action.hardware, ConsumerControl):
+                self.consumer_control_mask |= 1 << key_idx
+
+        self.keycodes = frozenset(self._codes(self.keyboard_mask))
+        self.consumer_control_codes = frozenset(self._codes(self.consumer_control_mask))
+
+    def _codes(self, mask):
+        return [self.actions[key_idx].code for key_idx in iter_bits(mask)]
 
     def clear(self):
-        self.keyboard.release_all()
-        self.consumer_control.release()
+        self.pressed_mask = 0
+        self.keyboard_report.release_all()
+        self.consumer_control_report.release_all()
 
     def update(self):
-        newly_pressed_actions = [
-            action
-            for key_idx, action in self.key_map.items()
-            if self.keybow.keys[key_idx].newly_pressed
-        ]
-        if not newly_pressed_actions:
-            self.clear()
+        pressed_mask = self.keybow.pressed_mask & self.key_mask
+        if pressed_mask == self.pressed_mask:
             return
 
-        keycodes_to_press = {
-            action.code
-            for action in newly_pressed_actions
-            if isinstance(action.hardware, Keyboard)
-        }
-
-        try:
-            consumer_control_code_to_press = [
-                action.code
-                for action in newly_pressed_actions
-                if isinstance(action.hardware, ConsumerControl)
-            ][0]
-        except IndexError:
-            consumer_control_code_to_press = None
-        if consumer_control_code_to_press:
-            print("consumer control", "sending", consumer_control_code_to_press)
-            self.consumer_control.press(consumer_control_code_to_press)
+        # macros start when their key is pressed
+        for key_idx in iter_bits(pressed_mask & ~self.pressed_mask & self.macro_mask):
+            self.actions[key_idx].send()
 
-        else:
-            self.clear_consumer_control()
-
-        if keycodes_to_press:
-            print("keyboard", "sending", keycodes_to_press)
-            self.keyboard.press(*keycodes_to_press)
-            self.keyboard.release(*(self.keycodes - keycodes_to_press))
-
-        else:
-            self.clear_keyboard()
+        self.pressed_mask = pressed_mask
+        self.keyboard_report.update(
+            frozenset(self._codes(pressed_mask & self.keyboard_mask))
+        )
+        self.consumer_control_report.update(
+            self._codes(pressed_mask & self.consumer_control_mask)
+        )
 
 
 class Action:
@@ -179,9 +308,16 @@ class Action:
 
 
 class IRAction(Action):
+    @property
+    def repeat_period(self):
+        return self.hardware.repeat_period
+
     def send(self):
         print(self.__class__.__name__, "sending", self.code)
-        self.hardware.send(self.code)
+        self.hardware.enqueue(self.code)
+
+    def repeat(self):
+        self.hardware.enqueue(self.code, repeat=True)
 
 
 class HIDAction(Action):
@@ -194,3 +330,29 @@ class HIDAction(Action):
     def send(self):
         self.press()
         self.release()
+
+
+class MacroAction(Action):
+    """
+    Runs a sequence of steps from src.macro, e.g.
+    MacroAction([tap(Keycode.CONTROL, Keycode.T), delay(0.2), text("kodi\n")],
+                keyboard=keyboard, layout=layout)
+    """
+
+    # held keys do not restart the macro
+    repeat_period = None
+
+    def __init__(self, steps, label="", keyboard=None, layout=None):
+        super().__init__(keyboard, compile_steps(steps, keyboard, layout), label)
+
+    def send(self):
+        macro_runner.start(self.code)
+
+    def repeat(self):
+        pass
+
+    def __str__(self) -> str:
+        return f"MacroAction(steps={len(self.code)})"
+
+    def __repr__(self) -> str:
+        return str(self)
@@ -0,0 +1,60 @@
+import displayio
+from fontio import Glyph
+from src.glyph_table import read_index, row_size
+
+
+class GlyphFont:
+    """
+    Font subset compiled into a binary glyph table, see glyph_table.py.
+    Only the index is read at startup, bitmaps are read from the file when their
+    glyph is first used. Glyphs missing from the table come from `fallback`.
+    """
+
+    def __init__(self, filepath, fallback=None):
+        self.filepath = filepath
+        self.fallback = fallback
+        with open(filepath, "rb") as table:
+            self._bounding_box, self.ascent, self.descent, self._index = read_index(
+                table
+            )
+        self._glyphs = {}
+
+    def get_bounding_box(self):
+        return self._bounding_box
+
+    def load_glyphs(self, code_points):
+        missing = [
+            code_point
+            for code_point in code_points
+            if code_point in self._index and code_point not in self._glyphs
+        ]
+        if not missing:
+            return
+
+        with open(self.filepath, "rb") as table:
+            for code_point in missing:
+                self._glyphs[code_point] = self._read_glyph(table, code_point)
+
+    def _read_glyph(self, table, code_point):
+        width, height, dx, dy, shift_x, offset = self._index[code_point]
+        size = row_size(width)
+        table.seek(offset)
+        rows = table.read(height * size)
+
+        bitmap = displayio.Bitmap(width, height, 2)
+        for y in range(height):
+            row = int.from_bytes(rows[y * size : (y + 1) * size], "big")
+            for x in range(width):
+                if row & (1 << (8 * size - 1 - x)):
+                    bitmap[x, y] = 1
+
+        return Glyph(bitmap, 0, width, height, dx, dy, shift_x, 0)
+
+    def get_glyph(self, code_point):
+        if code_point in self._index:
+            self.load_glyphs((code_point,))
+            return self._glyphs[code_point]
+
+        if self.fallback is not None:
+            return self.fallback.get_glyph(code_point)
+        return None
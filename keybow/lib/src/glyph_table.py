@@ -0,0 +1,73 @@
+import struct
+
+
+# Binary glyph table, as written by misc/fonts/build_font.py
+# All values are little-endian.
+#   header: magic, version, glyph count, bounding box (width, height, x, y offsets),
+#       ascent, descent
+#   index: one entry per glyph: code point, width, height, x offset, y offset,
+#       x shift, bitmap offset
+#   bitmaps: rows of (width + 7) // 8 bytes, most significant bit first
+FONT_MAGIC = b"GLYF"
+FONT_VERSION = 1
+HEADER_FORMAT = "<4sBHBBbbBB"
+ENTRY_FORMAT = "<IBBbbbI"
+
+
+def row_size(width):
+    return (width + 7) // 8
+
+
+def read_index(table):
+    """
+    return the bounding box, the ascent, the descent and a
+    {code point: (width, height, dx, dy, shift_x, offset)} dict
+    """
+    magic, version, count, *bounding_box, ascent, descent = struct.unpack(
+        HEADER_FORMAT, table.read(struct.calcsize(HEADER_FORMAT))
+    )
+    if magic != FONT_MAGIC or version != FONT_VERSION:
+        raise ValueError("not a valid glyph table")
+
+    index = {}
+    entry_size = struct.calcsize(ENTRY_FORMAT)
+    for _ in range(count):
+        code_point, *entry = struct.unpack(ENTRY_FORMAT, table.read(entry_size))
+        index[code_point] = tuple(entry)
+
+    return tuple(bounding_box), ascent, descent, index
+
+
+def write_table(table, bounding_box, ascent, descent, glyphs):
+    """
+    glyphs is a {code point: (width, height, dx, dy, shift_x, bitmap bytes)} dict
+    """
+    offset = struct.calcsize(HEADER_FORMAT) + len(glyphs) * struct.calcsize(
+        ENTRY_FORMAT
+    )
+
+    index = bytearray()
+    data = bytearray()
+    for code_point in sorted(glyphs):
+        width, height, dx, dy, shift_x, bitmap = glyphs[code_point]
+        if len(bitmap) != height * row_size(width):
+            raise ValueError(f"bad bitmap size for {hex(code_point)}")
+
+        index += struct.pack(
+            ENTRY_FORMAT, code_point, width, height, dx, dy, shift_x, offset + len(data)
+        )
+        data += bitmap
+
+    table.write(
+        struct.pack(
+            HEADER_FORMAT,
+            FONT_MAGIC,
+            FONT_VERSION,
+            len(glyphs),
+            *bounding_box,
+            ascent,
+            descent,
+        )
+    )
+    table.write(index)
+    table.write(data)
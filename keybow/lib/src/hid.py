@@ -0,0 +1,117 @@
+from adafruit_hid.consumer_control import ConsumerControl
+
+
+class KeyboardReport:
+    """
+    Keycodes held on the host: reports are sent only when they change.
+    Keys held by the layers (`update`) and by macros (`press` / `release`) are
+    tracked apart, a key is held on the host while either holds it.
+    """
+
+    def __init__(self, keyboard):
+        self.keyboard = keyboard
+        self.keycodes = frozenset()
+        self.layer_keycodes = frozenset()
+        self.macro_keycodes = frozenset()
+
+    def update(self, keycodes):
+        self.layer_keycodes = keycodes
+        self._send(keycodes | self.macro_keycodes)
+
+    def press(self, *keycodes):
+        self.macro_keycodes |= frozenset(keycodes)
+        self._send(self.layer_keycodes | self.macro_keycodes)
+
+    def release(self, *keycodes):
+        self.macro_keycodes -= frozenset(keycodes)
+        self._send(self.layer_keycodes | self.macro_keycodes)
+
+    def _send(self, keycodes):
+        released = self.keycodes - keycodes
+        pressed = keycodes - self.keycodes
+        if released:
+            self.keyboard.release(*released)
+        if pressed:
+            self.keyboard.press(*pressed)
+        self.keycodes = keycodes
+
+    def release_all(self):
+        self.layer_keycodes = self.macro_keycodes = frozenset()
+        if self.keycodes:
+            self.keyboard.release_all()
+            self.keycodes = frozenset()
+
+
+class ConsumerControlReport:
+    """
+    Consumer codes held on the host.
+    A report holds a single code: the last pressed one is sent. Releasing it
+    releases the report, as sending a code still held again would press it twice
+    on the host. Codes pressed at the same time are sent in turn, so that none of
+    them is lost.
+    As for the keyboard, codes held by the layers and by macros are tracked apart.
+    """
+
+    def __init__(self, consumer_control):
+        self.consumer_control = consumer_control
+        # held codes, last pressed last
+        self.codes = []
+        # code of the report, None once released
+        self.sent = None
+        self.layer_codes = []
+        self.macro_codes = []
+
+    def update(self, codes):
+        self.layer_codes = list(codes)
+        self._send(self._held())
+
+    def press(self, *codes):
+        self.macro_codes += [code for code in codes if code not in self.macro_codes]
+        self._send(self._held())
+
+    def release(self, *codes):
+        # as ConsumerControl.release, no code releases all of them
+        self.macro_codes = [
+            code for code in self.macro_codes if codes and code not in codes
+        ]
+        self._send(self._held())
+
+    def _held(self):
+        layer_codes = self.layer_codes
+        return layer_codes + [
+            code for code in self.macro_codes if code not in layer_codes
+        ]
+
+    def _send(self, codes):
+        held = [code for code in self.codes if code in codes]
+        pressed = [code for code in codes if code not in held]
+        self.codes = held + pressed
+
+        for code in pressed:
+            self.consumer_control.press(code)
+            self.sent = code
+
+        if self.sent is not None and self.sent not in self.codes:
+            self.consumer_control.release()
+            self.sent = None
+
+    def release_all(self):
+        self.layer_codes = []
+        self.macro_codes = []
+        if self.sent is not None:
+            self.consumer_control.release()
+            self.sent = None
+        self.codes = []
+
+
+# device -> report, devices are shared between layers and macros
+_reports = {}
+
+
+def get_report(device):
+    if device not in _reports:
+        if isinstance(device, ConsumerControl):
+            _reports[device] = ConsumerControlReport(device)
+        else:
+            _reports[device] = KeyboardReport(device)
+    return _reports[device]
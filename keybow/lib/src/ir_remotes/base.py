@@ -0,0 +1,116 @@
+from collections import OrderedDict
+
+import pulseio
+
+from .encoders.nec import (
+    NEC,
+    NEC_CARRIER,
+    NEC_REPEAT_PERIOD,
+    NEC_REPEAT_PULSES,
+    NECX,
+    nec_scancode_to_pulses,
+)
+from .encoders.rc5 import RC5, RC5_CARRIER, rc5_scancode_to_pulses
+from .transmit import transmit_queue
+
+
+DUTY_CYCLE = 2**14
+
+
+class PulseOutPool:
+    """
+    Keeps a single PulseOut alive per pin, shared by all the remotes using it.
+    The PulseOut is only rebuilt when the carrier frequency changes.
+    """
+
+    def __init__(self):
+        # pin -> (frequency, PulseOut)
+        self._pulseouts = {}
+
+    def get(self, pin, frequency):
+        current = self._pulseouts.get(pin)
+        if current is not None:
+            current_frequency, pulseout = current
+            if current_frequency == frequency:
+                return pulseout
+
+            pulseout.deinit()
+
+        pulseout = pulseio.PulseOut(pin, frequency=frequency, duty_cycle=DUTY_CYCLE)
+        self._pulseouts[pin] = (frequency, pulseout)
+        return pulseout
+
+    def release(self, pin):
+        current = self._pulseouts.pop(pin, None)
+        if current is not None:
+            current[1].deinit()
+
+    def release_all(self):
+        for pin in list(self._pulseouts):
+            self.release(pin)
+
+
+pulseout_pool = PulseOutPool()
+
+
+class IRRemote:
+    # protocols without a repeat code resend the full frame on hold
+    repeat_period = None
+
+    def __init__(self, pin, cache_size=16, pool=None, queue=None):
+        self.pin = pin
+        self.pool = pool or pulseout_pool
+        self.queue = queue or transmit_queue
+        self.cache_size = cache_size
+        # code -> ready-to-send pulses, least recently used first
+        self._pulses_cache = OrderedDict()
+
+    def get_pulses(self, code):
+        try:
+            pulses = self._pulses_cache.pop(code)
+        except KeyError:
+            pulses = self.code_to_pulses(code)
+            if len(self._pulses_cache) >= self.cache_size:
+                # circuitpython's OrderedDict has no move_to_end / popitem(last=)
+                del self._pulses_cache[next(iter(self._pulses_cache))]
+
+        self._pulses_cache[code] = pulses
+        return pulses
+
+    def warm_up(self, codes):
+        for code in codes:
+            self.get_pulses(code)
+
+    def send(self, code):
+        pulses = self.get_pulses(code)
+        self.pool.get(self.pin, self.frequency).send(pulses)
+
+    def send_repeat(self, code):
+        self.send(code)
+
+    def enqueue(self, code, repeat=False):
+        return self.queue.put(self, code, repeat)
+
+
+class NECRemote(IRRemote):
+    protocol = NEC
+    frequency = NEC_CARRIER
+    repeat_period = NEC_REPEAT_PERIOD
+
+    def code_to_pulses(self, code):
+        return nec_scancode_to_pulses(code, self.protocol)
+
+    def send_repeat(self, code):
+        self.pool.get(self.pin, self.frequency).send(NEC_REPEAT_PULSES)
+
+
+class NECXRemote(NECRemote):
+    protocol = NECX
+
+
+class RC5Remote(IRRemote):
+    protocol = RC5
+    frequency = RC5_CARRIER
+
+    def code_to_pulses(self, code):
+        return rc5_scancode_to_pulses(code)
@@ -0,0 +1,79 @@
+import struct
+
+
+# Binary code table, as written by misc/ir_remotes/build_code_table.py
+# All values are little-endian.
+#   header: magic, version, protocol length, entry count, carrier frequency
+#   protocol name
+#   index: one entry per code: code, pulses offset, pulses count, name length, name
+#   pulses: unsigned shorts
+TABLE_MAGIC = b"IRCT"
+TABLE_VERSION = 1
+HEADER_FORMAT = "<4sBBHI"
+ENTRY_FORMAT = "<IIHB"
+
+
+def read_index(table):
+    """
+    return the protocol, the carrier frequency, a {code: (offset, count)} dict
+    and a {name: code} dict
+    """
+    magic, version, protocol_length, count, frequency = struct.unpack(
+        HEADER_FORMAT, table.read(struct.calcsize(HEADER_FORMAT))
+    )
+    if magic != TABLE_MAGIC or version != TABLE_VERSION:
+        raise ValueError("not a valid code table")
+
+    protocol = table.read(protocol_length).decode()
+
+    index = {}
+    names = {}
+    entry_size = struct.calcsize(ENTRY_FORMAT)
+    for _ in range(count):
+        code, offset, pulses_count, name_length = struct.unpack(
+            ENTRY_FORMAT, table.read(entry_size)
+        )
+        index[code] = (offset, pulses_count)
+        name = table.read(name_length).decode()
+        if name and name not in names:
+            names[name] = code
+
+    return protocol, frequency, index, names
+
+
+def write_table(table, protocol, frequency, entries):
+    """
+    entries is a {code: (name, pulses)} dict
+    """
+    protocol_bytes = protocol.encode()
+    names = {code: name.encode()[:255] for code, (name, _) in entries.items()}
+
+    offset = (
+        struct.calcsize(HEADER_FORMAT)
+        + len(protocol_bytes)
+        + sum(struct.calcsize(ENTRY_FORMAT) + len(name) for name in names.values())
+    )
+
+    index = bytearray()
+    data = bytearray()
+    for code in sorted(entries):
+        pulses = entries[code][1]
+        index += struct.pack(
+            ENTRY_FORMAT, code, offset + len(data), len(pulses), len(names[code])
+        )
+        index += names[code]
+        data += struct.pack(f"<{len(pulses)}H", *pulses)
+
+    table.write(
+        struct.pack(
+            HEADER_FORMAT,
+            TABLE_MAGIC,
+            TABLE_VERSION,
+            len(protocol_bytes),
+            len(entries),
+            frequency,
+        )
+    )
+    table.write(protocol_bytes)
+    table.write(index)
+    table.write(data)
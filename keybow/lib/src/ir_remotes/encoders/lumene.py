@@ -1,4 +1,4 @@
-from .utils import IRValue, decode_bits, generate_pulses
+from .utils import IRValue, PulseEncoder, decode_bits
 
 
 LUMENE = "lumene"
@@ -29,5 +29,10 @@ def pulses_to_lumene_code(pulses):
     return hex(int(bits, 2))
 
 
-def lumene_scancode_to_pulses(scancode):
-    return generate_pulses(one=LUMENE_BIT_1, zero=LUMENE_BIT_0, nbits=32, data=scancode)
+LUMENE_ENCODER = PulseEncoder(one=LUMENE_BIT_1, zero=LUMENE_BIT_0, nbits=LUMENE_NBITS)
+
+
+def lumene_scancode_to_pulses(scancode, buffer=None):
+    if buffer is None:
+        return LUMENE_ENCODER.encode(scancode)
+    return LUMENE_ENCODER.encode_into(buffer, scancode)
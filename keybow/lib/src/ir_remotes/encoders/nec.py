@@ -1,6 +1,8 @@
+from array import array
+
 from adafruit_itertools.adafruit_itertools_extras import grouper
 
-from .utils import IRValue, eq_margin, generate_pulses
+from .utils import IRValue, PulseEncoder, eq_margin
 
 
 def bitrev8(byte):
@@ -28,6 +30,8 @@ NEC_TRAILER_PULSE = 1 * NEC_UNIT
 NEC_TRAILER_SPACE = 10 * NEC_UNIT
 NECX_REPEAT_BITS = 1
 NEC_CARRIER = 38_000
+# a full frame or a repeat burst starts every 108ms while the key is held
+NEC_REPEAT_PERIOD = 0.108
 
 NEC_BIT_SPACE = {"0": NEC_BIT_0_SPACE, "1": NEC_BIT_1_SPACE}
 
@@ -127,17 +131,25 @@ def nec_scancode_to_bits(scancode, protocol):
     return data_inv << 24 | data << 16 | addr_inv << 8 | addr
 
 
-def nec_bits_to_pulses(data):
-    return generate_pulses(
-        one=IRValue(NEC_BIT_PULSE, NEC_BIT_1_SPACE),
-        zero=IRValue(NEC_BIT_PULSE, NEC_BIT_0_SPACE),
-        nbits=NEC_NBITS,
-        data=data,
-        header=IRValue(NEC_HEADER_PULSE, NEC_HEADER_SPACE),
-        msb=False,
-        trailer=NEC_TRAILER_PULSE,
-    )
+NEC_ENCODER = PulseEncoder(
+    one=IRValue(NEC_BIT_PULSE, NEC_BIT_1_SPACE),
+    zero=IRValue(NEC_BIT_PULSE, NEC_BIT_0_SPACE),
+    nbits=NEC_NBITS,
+    header=IRValue(NEC_HEADER_PULSE, NEC_HEADER_SPACE),
+    msb=False,
+    trailer=NEC_TRAILER_PULSE,
+)
+
+
+# header mark, short space and trailer, sent instead of the full frame on hold
+NEC_REPEAT_PULSES = array("H", (NEC_HEADER_PULSE, NEC_REPEAT_SPACE, NEC_TRAILER_PULSE))
+
+
+def nec_bits_to_pulses(data, buffer=None):
+    if buffer is None:
+        return NEC_ENCODER.encode(data)
+    return NEC_ENCODER.encode_into(buffer, data)
 
 
-def nec_scancode_to_pulses(scancode, protocol):
-    return nec_bits_to_pulses(nec_scancode_to_bits(scancode, protocol))
+def nec_scancode_to_pulses(scancode, protocol, buffer=None):
+    return nec_bits_to_pulses(nec_scancode_to_bits(scancode, protocol), buffer)
@@ -1,3 +1,5 @@
+from array import array
+
 from adafruit_itertools import chain_from_iterable, groupby
 
 from .utils import eq_margin
@@ -57,4 +59,4 @@ def rc5_scancode_to_pulses(scancode, reverse_bit=False):
     pulses = pulses[1:]
     if pulses[-1] < 0:
         pulses = pulses[:-1]
-    return list(map(abs, pulses))
+    return array("H", map(abs, pulses))
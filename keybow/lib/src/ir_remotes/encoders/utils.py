@@ -1,11 +1,6 @@
+from array import array
 from collections import namedtuple
 
-
-try:
-    from ulab import numpy
-except ModuleNotFoundError:
-    import numpy
-
 from adafruit_itertools import chain_from_iterable
 from adafruit_itertools.adafruit_itertools_extras import grouper
 
@@ -34,21 +29,37 @@ def parse_ir_ctl_string(raw: str) -> list[int]:
     return [int(raw_pulse[1:]) for raw_pulse in raw.split()]
 
 
-def find_lengths(pulses: list[int]) -> dict[int, int]:
-    lengths = {pulses[0]: [pulses[0]]}
-    for pulse in pulses[1:]:
-        if any(
-            eq_margin(pulse, pulse_length := length, length * 0.1) for length in lengths
-        ):
-            values = lengths.pop(pulse_length)
-            values.append(pulse)
+def find_lengths(pulses: list[int], tolerance: float = 0.2) -> dict[int, int]:
+    """
+    Cluster pulse lengths, return a {mean length: count} dict.
+    Pulses are sorted, then merged in a single pass into the current cluster
+    while they are within `tolerance` (relative) of its running mean.
+    The lengths of a protocol are at least 1.5 times apart, while captured pulses
+    are often 15% off: a tighter tolerance splits a few of them into their own
+    cluster.
+    """
+    lengths = {}
+    total = count = 0
+    for pulse in sorted(pulses):
+        # pulses are sorted, so the running mean is never above the pulse
+        if count and pulse * count - total > tolerance * total:
+            lengths[round(total / count)] = count
+            total = count = 0
 
-            new_mean = round(numpy.mean(values))
-            lengths[new_mean] = values
-        else:
-            lengths[pulse] = [pulse]
+        total += pulse
+        count += 1
+
+    if count:
+        lengths[round(total / count)] = count
+
+    return lengths
 
-    return {length: len(pulses) for length, pulsees in lengths.items()}
+
+def nearest_length(pulse: int, lengths: list[int], margin: float) -> int:
+    length = min(lengths, key=lambda length: abs(pulse - length))
+    if not eq_margin(pulse, length, margin):
+        raise IRDecodeException(f"{pulse} does not match any of {sorted(lengths)}")
+    return length
 
 
 def generate_pulses(
@@ -79,14 +90,86 @@ def generate_pulses(
     return pulses
 
 
+class PulseEncoder:
+    """
+    Integer-only pulse encoder.
+    Bits are looked up 4 at a time in a precomputed mark / space table, and written
+    directly into a preallocated `array("H")`.
+    Produces the same pulses as `generate_pulses`.
+    """
+
+    def __init__(
+        self,
+        one: IRValue,
+        zero: IRValue,
+        nbits: int,
+        header: IRValue | None = None,
+        trailer: int = 0,
+        msb: bool = True,
+    ):
+        if nbits % 4:
+            raise ValueError("nbits must be a multiple of 4")
+
+        self.nbits = nbits
+        self.msb = msb
+        self.header = header if header and header.mark else None
+        self.trailer = trailer
+        self.length = 2 * nbits + (2 if self.header else 0) + (1 if trailer else 0)
+
+        # for each nibble value, its 4 bits as 8 marks / spaces, in sending order
+        bit_order = (3, 2, 1, 0) if msb else (0, 1, 2, 3)
+        self._table = array("H")
+        for nibble in range(16):
+            for bit_idx in bit_order:
+                self._table.extend(one if (nibble >> bit_idx) & 1 else zero)
+
+    def new_buffer(self):
+        return array("H", bytes(2 * self.length))
+
+    def encode_into(self, buffer, data: int):
+        if data >> self.nbits:
+            raise ValueError(f"{hex(data)} does not fit in {self.nbits} bits")
+
+        table = self._table
+        idx = 0
+        if self.header:
+            buffer[0], buffer[1] = self.header
+            idx = 2
+
+        if self.msb:
+            shift = self.nbits - 4
+            step = -4
+        else:
+            shift = 0
+            step = 4
+
+        for _ in range(self.nbits // 4):
+            offset = ((data >> shift) & 0xF) << 3
+            buffer[idx] = table[offset]
+            buffer[idx + 1] = table[offset + 1]
+            buffer[idx + 2] = table[offset + 2]
+            buffer[idx + 3] = table[offset + 3]
+            buffer[idx + 4] = table[offset + 4]
+            buffer[idx + 5] = table[offset + 5]
+            buffer[idx + 6] = table[offset + 6]
+            buffer[idx + 7] = table[offset + 7]
+            idx += 8
+            shift += step
+
+        if self.trailer:
+            buffer[idx] = self.trailer
+
+        return buffer
+
+    def encode(self, data: int):
+        return self.encode_into(self.new_buffer(), data)
+
+
 def get_theoretical_bit(
     two_pulses: tuple[int, int], lengths: list[int]
 ) -> tuple[int, int]:
     unit = min(lengths)
-    return tuple(
-        next(length for length in lengths if eq_margin(pulse, length, unit / 2))
-        for pulse in two_pulses
-    )
+    return tuple(nearest_length(pulse, lengths, unit / 2) for pulse in two_pulses)
 
 
 def decode_bits(
@@ -95,6 +178,7 @@ def decode_bits(
     zero: tuple[int, int] | None = None,
     first_bit_value=1,
     has_trail=True,
+    tolerance: float = 0.2,
 ) -> list[int]:
     assert (one is None) == (zero is None)
     pulses = pulses.copy()
@@ -102,12 +186,14 @@ def decode_bits(
         if has_trail:
             pulses = pulses[:-1]
 
-    lengths = find_lengths(pulses)
+    lengths = find_lengths(pulses, tolerance)
 
     # remove outliers
     valid_lengths = [length for length, count in lengths.items() if count > 1]
+    if not valid_lengths:
+        raise IRDecodeException("no pulse length is repeated")
 
-    unit = min(lengths)
+    unit = min(valid_lengths)
 
     # remove outliers (possibly the header)
     pulses = [
@@ -1,42 +1,5 @@
-import array
-
-import pulseio
-
+from .base import IRRemote, NECRemote, NECXRemote, RC5Remote
 from .encoders.lumene import LUMENE, LUMENE_CARRIER, lumene_scancode_to_pulses
-from .encoders.nec import NEC, NEC_CARRIER, NECX, nec_scancode_to_pulses
-from .encoders.rc5 import RC5, RC5_CARRIER, rc5_scancode_to_pulses
-
-
-class IRRemote:
-    def __init__(self, pin):
-        self.pin = pin
-
-    def send(self, code):
-        pulses = array.array("H", self.code_to_pulses(code))
-        with pulseio.PulseOut(
-            self.pin, frequency=self.frequency, duty_cycle=2**14
-        ) as pulseout:
-            pulseout.send(pulses)
-
-
-class NECRemote(IRRemote):
-    protocol = NEC
-    frequency = NEC_CARRIER
-
-    def code_to_pulses(self, code):
-        return nec_scancode_to_pulses(code, self.protocol)
-
-
-class NECXRemote(NECRemote):
-    protocol = NECX
-
-
-class RC5Remote(IRRemote):
-    protocol = RC5
-    frequency = RC5_CARRIER
-
-    def code_to_pulses(self, code):
-        return rc5_scancode_to_pulses(code)
 
 
 class BenQ(NECXRemote):
@@ -0,0 +1,46 @@
+from array import array
+
+from .base import IRRemote
+from .code_table import read_index
+from .encoders.nec import NEC, NEC32, NEC_REPEAT_PERIOD, NEC_REPEAT_PULSES, NECX
+
+
+NEC_PROTOCOLS = (NEC, NECX, NEC32)
+
+
+class TableRemote(IRRemote):
+    """
+    Remote whose pulses are precomputed in a binary code table, see code_table.py.
+    Only the index is kept in memory, pulses are read from the file on demand.
+    """
+
+    def __init__(self, pin, filepath, **kwargs):
+        super().__init__(pin, **kwargs)
+        self.filepath = filepath
+        with open(filepath, "rb") as table:
+            # self.codes is a name -> code dict
+            self.protocol, self.frequency, self._index, self.codes = read_index(table)
+
+        if self.protocol in NEC_PROTOCOLS:
+            self.repeat_period = NEC_REPEAT_PERIOD
+
+    def code_to_pulses(self, code):
+        try:
+            offset, count = self._index[code]
+        except KeyError:
+            raise ValueError(f"{hex(code)} is not in {self.filepath}")
+
+        pulses = array("H", bytes(2 * count))
+        with open(self.filepath, "rb") as table:
+            table.seek(offset)
+            table.readinto(pulses)
+        return pulses
+
+    def send_repeat(self, code):
+        if self.protocol in NEC_PROTOCOLS:
+            self.pool.get(self.pin, self.frequency).send(NEC_REPEAT_PULSES)
+        else:
+            self.send(code)
+
+    def __contains__(self, code):
+        return code in self._index
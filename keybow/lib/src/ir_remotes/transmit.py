@@ -0,0 +1,52 @@
+"""
+Queue of the IR frames to send, apart from base.py so that the main loop can
+use it without importing pulseio and building the encoder tables.
+"""
+
+
+class TransmitQueue:
+    """
+    Pending IR frames, drained one frame per main loop iteration, so that keys
+    keep being scanned between frames.
+    Identical pending frames are coalesced.
+    """
+
+    def __init__(self, max_size=8):
+        self.max_size = max_size
+        # (remote, code, repeat), oldest first
+        self._frames = []
+
+    def put(self, remote, code, repeat=False):
+        frame = (remote, code, repeat)
+        if frame in self._frames:
+            return False
+
+        # a pending full frame already covers a repeat of the same code
+        if repeat and (remote, code, False) in self._frames:
+            return False
+
+        if len(self._frames) >= self.max_size:
+            self._frames.pop(0)
+
+        self._frames.append(frame)
+        return True
+
+    def send_next(self):
+        if not self._frames:
+            return False
+
+        remote, code, repeat = self._frames.pop(0)
+        if repeat:
+            remote.send_repeat(code)
+        else:
+            remote.send(code)
+        return True
+
+    def clear(self):
+        self._frames.clear()
+
+    def __len__(self):
+        return len(self._frames)
+
+
+transmit_queue = TransmitQueue()
@@ -1,15 +1,15 @@
 import time
-from collections import namedtuple
+from array import array
 
 import board
 from adafruit_is31fl3731.keybow2040 import Keybow2040 as Pixels
-from digitalio import DigitalInOut, Pull
-from src.utils import Matrix, number_to_xy
+from src.animation import FrameAnimator
+from src.scanner import make_scanner
+from src.utils import Matrix, iter_bits, number_to_xy
 
 
 EVENTS = ["pressed", "held", "released", "hold_released", "tapped"]
 
-KeyState = namedtuple("KeyState", EVENTS)
 ROW_SIZE = 4
 
 
@@ -19,16 +19,47 @@ class EventHandler:
         self.key = key
         self.funcs = funcs or []
 
-        self.state = False
-        self.previous_state = False
+    def trigger(self):
+        for func in self.funcs:
+            func(self.key)
 
-    def update_state(self, new_state):
-        self.previous_state = self.state
-        self.state = new_state
 
-        if self.state and not self.previous_state and self.funcs:
-            for func in self.funcs:
-                func(self.key)
+class EventQueue:
+    """
+    Preallocated ring buffer of key events: key idx, event idx (in EVENTS) and
+    tick (ms).
+    Consumers keep their own cursor, and read the events written since.
+    """
+
+    def __init__(self, size=64):
+        self.size = size
+        self.keys = bytearray(size)
+        self.events = bytearray(size)
+        self.ticks = array("L", [0] * size)
+        # number of events ever written
+        self.head = 0
+
+    def push(self, key_idx, event_idx, tick):
+        position = self.head % self.size
+        self.keys[position] = key_idx
+        self.events[position] = event_idx
+        self.ticks[position] = tick
+        self.head += 1
+
+    def get(self, position):
+        position %= self.size
+        return self.keys[position], EVENTS[self.events[position]], self.ticks[position]
+
+    def read(self, cursor):
+        """
+        return the events written since cursor, and the new cursor.
+        Events overwritten before being read are lost.
+        """
+        if cursor == self.head:
+            return (), cursor
+
+        start = max(cursor, self.head - self.size)
+        return [self.get(position) for position in range(start, self.head)], self.head
 
 
 _PINS = Matrix(
@@ -89,6 +120,7 @@ class Key(LED):
     """
     Represents a key on Keybow 2040, with associated switch and
     LED behaviours.
+    The key states are bits of the Keybow masks, updated for all keys at once.
 
     :param idx: the key idx (0-15) to associate with the key
     """
@@ -99,77 +131,53 @@ class Key(LED):
         pin,
         keybow,
         hold_threshold=0.1,
+        debounce=4,
         event_handlers=None,
         rgb=None,
     ):
         self.idx = idx
-        self.switch = DigitalInOut(pin)
-        self.switch.pull = Pull.UP
+        self.mask = 1 << idx
         self._pin = pin
 
         self.hold_threshold = hold_threshold
+        # number of identical consecutive reads for a state change to be accepted
+        self.debounce = debounce
 
         self.event_handlers = {event: EventHandler(event, self) for event in EVENTS}
         if event_handlers:
             self.event_handlers.update(event_handlers)
 
-        self._time_of_last_press = time.monotonic()
-        self._time_held_for = 0
-
         super().__init__(idx=idx, keybow=keybow, rgb=rgb)
 
     def is_pressed(self) -> bool:
         """
         Returns the state of the key (0=not pressed, 1=pressed).
         """
-        return not self.switch.value
-
-    def update_elapsed_times(self, previous_pressed):
-        update_time = time.monotonic()
-        if not self.pressed:
-            self._time_held_for = 0
-
-        # If the key has just been pressed, then record the
-        # `time_of_last_press`.
-        elif not previous_pressed:
-            self._time_of_last_press = update_time
-
-        # If the key is pressed and held, then update the
-        # `_time_held_for` variable.
-        else:
-            self._time_held_for = update_time - self._time_of_last_press
+        return self.keybow.scanner.is_pressed(self.idx)
 
     @property
-    def previous_state(self):
-        return KeyState(
-            *(self.event_handlers[event].previous_state for event in EVENTS)
-        )
+    def pressed(self) -> bool:
+        return bool(self.keybow.pressed_mask & self.mask)
 
     @property
-    def newly_pressed(self):
-        pressed_handler = self.event_handlers["pressed"]
-        return pressed_handler.state and not pressed_handler.previous_state
-
-    def update(self):
-        # Updates the state of the key and updates all of its
-        # attributes.
-
-        # Keys get locked during the debounce time.
-
-        _previous_state = self.previous_state
+    def newly_pressed(self) -> bool:
+        return bool(self.keybow.newly_pressed_mask & self.mask)
 
-        self.pressed = self.is_pressed()
-
-        self.held = self.pressed and self._time_held_for > self.hold_threshold
+    @property
+    def held(self) -> bool:
+        return bool(self.keybow.held_mask & self.mask)
 
-        self.released = not self.pressed and _previous_state.pressed
-        self.tapped = self.released and not _previous_state.held
-        self.hold_released = self.released and _previous_state.held
+    @property
+    def released(self) -> bool:
+        return bool(self.keybow.released_mask & self.mask)
 
-        self.update_elapsed_times(_previous_state.pressed)
+    @property
+    def tapped(self) -> bool:
+        return bool(self.keybow.tapped_mask & self.mask)
 
-        for event in EVENTS:
-            self.event_handlers[event].update_state(getattr(self, event))
+    @property
+    def hold_released(self) -> bool:
+        return bool(self.keybow.hold_released_mask & self.mask)
 
     def on_event(self, event):
         if event not in EVENTS:
@@ -190,13 +198,139 @@ class Key(LED):
         return f"Key(idx={self.idx}, state={self.is_pressed()})"
 
 
+# first PWM register of the IS31FL3731, and their count
+COLOR_OFFSET = 0x24
+PWM_REGISTERS = 144
+FRAMES = 8
+
+# function registers of the IS31FL3731
+CONFIG_BANK = 0x0B
+FRAME_REGISTER = 0x01
+BREATH1_REGISTER = 0x08
+BREATH2_REGISTER = 0x09
+
+
+def _breath_step(duration, base):
+    # breath times are base * 2**n, with n in 0..7
+    step = 0
+    while step < 7 and base * 2**step < duration:
+        step += 1
+    return step
+
+
 class Pixels(Pixels):
+    """
+    Colors are written to a shadow copy of the PWM registers, and sent to the
+    IS31FL3731 by `show`, in a single auto-increment write of the changed span.
+    Each frame has its own copy, writes go to the selected frame.
+    """
+
+    def __init__(self, i2c, *args, **kwargs):
+        super().__init__(i2c, *args, **kwargs)
+        # the first byte is the register address of the write
+        self._buffers = [bytearray(1 + PWM_REGISTERS) for _ in range(FRAMES)]
+        self._buffer = self._buffers[self._frame]
+        # key idx -> buffer positions of its r, g, b registers
+        self._positions = [self._rgb_positions(idx) for idx in range(ROW_SIZE**2)]
+        # changed span of the buffer, empty when first > last
+        self._first_dirty = len(self._buffer)
+        self._last_dirty = 0
+
+    def _rgb_positions(self, idx):
+        y, x = number_to_xy(idx, ROW_SIZE)  # axis are reversed
+        # same layout as Keybow2040.pixelrgb, whose channels are g, r, b
+        column = 4 * (3 - x) + y
+        g, r, b = (1 + self.pixel_addr(column, channel) for channel in range(3))
+        return r, g, b
+
     def set_pixel(self, idx, r, g, b):
-        if isinstance(idx, int):
-            idx = number_to_xy(idx, ROW_SIZE)
+        if not isinstance(idx, int):
+            x, y = idx
+            idx = x * ROW_SIZE + y
+
+        buffer = self._buffer
+        for position, value in zip(self._positions[idx], (r, g, b)):
+            if buffer[position] != value:
+                buffer[position] = value
+                if position < self._first_dirty:
+                    self._first_dirty = position
+                if position > self._last_dirty:
+                    self._last_dirty = position
+
+    def show(self):
+        first, last = self._first_dirty, self._last_dirty
+        if first > last:
+            return
+
+        self._write(self._frame, first, last)
+        self._first_dirty = len(self._buffer)
+        self._last_dirty = 0
+
+    def _write(self, frame, first, last):
+        buffer = self._buffers[frame]
+        # the byte before the span temporarily holds the register address
+        previous = buffer[first - 1]
+        buffer[first - 1] = COLOR_OFFSET + first - 1
+        self._bank(frame)
+        with self.i2c_device as i2c:
+            i2c.write(buffer, start=first - 1, end=last + 1)
+        buffer[first - 1] = previous
+
+    def select_frame(self, frame):
+        """
+        Display `frame`, and direct the next writes to it
+        """
+        if frame == self._frame:
+            return
+        self.show()
+        self.frame(frame)
+        self._buffer = self._buffers[frame]
 
-        y, x = idx  # axis are reversed
-        self.pixelrgb(x, y, r, g, b)
+    def display_frame(self, frame):
+        """
+        Display `frame`, writes still go to the selected frame
+        """
+        self._register(CONFIG_BANK, FRAME_REGISTER, frame)
+
+    def load_frame(self, frame, colors):
+        """
+        Write the colors of all keys, (r, g, b) by key idx, to `frame` at once
+        """
+        buffer = self._buffers[frame]
+        for positions, rgb in zip(self._positions, colors):
+            for position, value in zip(positions, rgb):
+                buffer[position] = value
+        self._write(frame, 1, PWM_REGISTERS)
+        if frame == self._frame:
+            self._first_dirty = len(buffer)
+            self._last_dirty = 0
+
+    def copy_frame(self, source, target, scale=1.0):
+        source_buffer, buffer = self._buffers[source], self._buffers[target]
+        for position in range(1, len(buffer)):
+            buffer[position] = int(source_buffer[position] * scale)
+        self._write(target, 1, PWM_REGISTERS)
+
+    def breathe(self, fade_in=None, fade_out=None, extinguish=0):
+        """
+        Let the chip fade the displayed frame in and out, times in ms are rounded
+        up to 26ms * 2**n for the fades, and 3.5ms * 2**n for the extinguish time.
+        Disabled when fade_in is None.
+        """
+        if fade_in is None:
+            self._register(CONFIG_BANK, BREATH2_REGISTER, 0)
+            return
+
+        if fade_out is None:
+            fade_out = fade_in
+        self._register(
+            CONFIG_BANK,
+            BREATH1_REGISTER,
+            _breath_step(fade_out, 26) << 4 | _breath_step(fade_in, 26),
+        )
+        self._register(
+            CONFIG_BANK, BREATH2_REGISTER, 1 << 4 | _breath_step(extinguish, 3.5)
+        )
 
 
 class Keybow:
@@ -206,11 +340,43 @@ class Keybow:
 
     """
 
-    def __init__(self, led_sleep_time=None):
+    def __init__(self, led_sleep_time=None, backend=None):
         self.i2c = board.I2C()
         self._pixels = Pixels(self.i2c)
-
-        self.keys = Matrix(*tuple(Key(idx, pin, self) for idx, pin in enumerate(_PINS)))
+        self.animator = FrameAnimator(self._pixels)
+
+        # see src.scanner, keypad scans in the background when available
+        self.backend = backend
+        self.scanner = make_scanner(_PINS, backend)
+        debounce = 1 if self.scanner.debounced else 4
+        self.keys = Matrix(
+            *tuple(
+                Key(idx, pin, self, debounce=debounce) for idx, pin in enumerate(_PINS)
+            )
+        )
+        self._press_times = [0.0] * len(self.keys)
+
+        self.events = EventQueue()
+
+        # keys reported as pressed for the next reads, see resume
+        self._forced_mask = 0
+        self._forced_reads = 0
+        self._forced_until = 0.0
+
+        # ring buffer of the last raw switch reads
+        self._reads = []
+        self._read_idx = 0
+        # (number of reads, mask of the keys using it)
+        self._debounce_groups = ()
+        self.update_debounce()
+
+        # one bit per key, bit n is key n
+        self.pressed_mask = 0
+        self.newly_pressed_mask = 0
+        self.held_mask = 0
+        self.released_mask = 0
+        self.tapped_mask = 0
+        self.hold_released_mask = 0
 
         self.led_sleep_time = led_sleep_time
 
@@ -218,16 +384,129 @@ class Keybow:
         self._was_asleep = False
         self._time_of_last_press = time.monotonic()
 
+    def read_switches(self) -> int:
+        state = self.scanner.read()
+        if self._forced_mask:
+            # forced until the scanner reports the key, or its first scans are done
+            if self._forced_reads or (
+                not state & self._forced_mask and time.monotonic() < self._forced_until
+            ):
+                self._forced_reads = max(self._forced_reads - 1, 0)
+                state |= self._forced_mask
+            else:
+                self._forced_mask = 0
+        return state
+
+    def suspend(self):
+        """
+        Release the switch pins (e.g. to wake up from sleep on them), and return them
+        """
+        self.scanner.deinit()
+        return tuple(_PINS)
+
+    def resume(self, pin=None):
+        """
+        Scan the switches again, after suspend.
+        The key of `pin` is reported as pressed, as it may already be released.
+        """
+        self.scanner = make_scanner(_PINS, self.backend)
+        for key in self.keys:
+            if key._pin == pin:
+                self._forced_mask = key.mask
+                # long enough to get through the debounce
+                self._forced_reads = max(_key.debounce for _key in self.keys)
+                # the keypad backend reports the key after its first scans
+                self._forced_until = time.monotonic() + 2 * self.scanner.interval
+
+    def set_debounce(self, key_idx, reads):
+        self.keys[key_idx].debounce = reads
+        self.update_debounce()
+
+    def update_debounce(self):
+        groups = {}
+        for key in self.keys:
+            reads = max(key.debounce, 1)
+            groups[reads] = groups.get(reads, 0) | key.mask
+
+        self._debounce_groups = tuple(groups.items())
+        self._reads = [0] * max(groups)
+        self._read_idx = 0
+
+    def debounce(self, raw):
+        """
+        Integrating debounce: a key changes state once its last n reads agree
+        """
+        reads = self._reads
+        reads[self._read_idx] = raw
+        self._read_idx = (self._read_idx + 1) % len(reads)
+
+        state = self.pressed_mask
+        for count, mask in self._debounce_groups:
+            all_pressed = mask
+            any_pressed = 0
+            idx = self._read_idx
+            for _ in range(count):
+                idx = (idx - 1) % len(reads)
+                all_pressed &= reads[idx]
+                any_pressed |= reads[idx]
+
+            # pressed if all reads are, released if none are, unchanged otherwise
+            state = (state & ~mask) | all_pressed | (state & any_pressed & mask)
+
+        return state
+
+    def update_masks(self, pressed, now):
+        previous_pressed = self.pressed_mask
+        previous_held = self.held_mask
+
+        newly_pressed = pressed & ~previous_pressed
+        released = previous_pressed & ~pressed
+
+        for idx in iter_bits(newly_pressed):
+            self._press_times[idx] = now
+
+        held = pressed & previous_held
+        for idx in iter_bits(pressed & ~held & ~newly_pressed):
+            if now - self._press_times[idx] > self.keys[idx].hold_threshold:
+                held |= 1 << idx
+
+        self.pressed_mask = pressed
+        self.newly_pressed_mask = newly_pressed
+        self.held_mask = held
+        self.released_mask = released
+        self.tapped_mask = released & ~previous_held
+        self.hold_released_mask = released & previous_held
+
+        # events happen when their state becomes true, in the order of EVENTS
+        return (
+            newly_pressed,
+            held & ~previous_held,
+            released,
+            self.hold_released_mask,
+            self.tapped_mask,
+        )
+
+    def dispatch(self, edges, now):
+        tick = int(now * 1000) & 0xFFFFFFFF
+        for event_idx, mask in enumerate(edges):
+            event = EVENTS[event_idx]
+            for idx in iter_bits(mask):
+                self.events.push(idx, event_idx, tick)
+                handler = self.keys[idx].event_handlers[event]
+                if handler.funcs:
+                    handler.trigger()
+
     def update_keys(self):
         # Call this in each iteration of your while loop to update
         # to update everything's state, e.g. `keybow.update()`
-        for _key in self.keys:
-            _key.update()
+        now = time.monotonic()
+        pressed = self.debounce(self.read_switches())
+        # idle: nothing pressed now, nor during the previous iteration
+        if pressed or self.pressed_mask or self.released_mask:
+            self.dispatch(self.update_masks(pressed, now), now)
 
         self._was_asleep = self.sleeping
 
-        now = time.monotonic()
-
         if self.any_pressed:
             self._time_of_last_press = now
 
@@ -238,37 +517,46 @@ class Keybow:
         )
 
         if self.sleeping and not self._was_asleep:
-            for _key in self.keys:
-                _key.sleeping_lit = _key.lit
-                _key.lit = False
+            self.animator.sleep()
 
         if not self.sleeping and self._was_asleep:
-            for _key in self.keys:
-                _key.lit = _key.sleeping_lit
-                _key.sleeping_lit = False
+            self.animator.wake()
 
     def update(self):
         self.update_keys()
 
+    def show(self):
+        # Call this once per loop, after all LED changes
+        self._pixels.show()
+
     def set_led_color(self, idx, r: int, g: int, b: int):
         self.keys[idx].lit = (r, g, b)
 
     def get_states(self):
         # Returns a Boolean list of Keybow's key states
         # (0=not pressed, 1=pressed).
-        return [_key.pressed for _key in self.keys]
+        return [bool(self.pressed_mask & key.mask) for key in self.keys]
 
     @property
     def pressed(self):
-        return [key for key in self.keys if key.pressed]
+        return [self.keys[idx] for idx in iter_bits(self.pressed_mask)]
 
     @property
     def not_pressed(self):
-        return [key for key in self.keys if not key.pressed]
+        return [key for key in self.keys if not self.pressed_mask & key.mask]
 
     @property
     def any_pressed(self):
-        return any(self.get_states())
+        return self.pressed_mask != 0
+
+    @property
+    def debouncing(self):
+        """
+        Whether a switch read differs from its debounced state, e.g. a press not
+        accepted yet
+        """
+        pressed = self.pressed_mask
+        return any(read != pressed for read in self._reads)
 
     def on_event(self, key_idx, event):
         return self.keys[key_idx].on_event(event)
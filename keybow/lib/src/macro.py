@@ -0,0 +1,132 @@
+"""
+Macros: sequences of key presses, typed text, delays and IR sends.
+They are compiled into flat step lists when the config is loaded, then run by
+`macro_runner`, one step per main loop iteration, so that keys are still
+scanned while a macro runs.
+"""
+import time
+
+from adafruit_hid.consumer_control import ConsumerControl
+from src.hid import get_report
+
+
+# step operations
+PRESS = 0
+RELEASE = 1
+DELAY = 2
+IR = 3
+# typed text, compiled into PRESS and RELEASE steps
+TEXT = 4
+
+
+def press(*codes, device=None):
+    # device defaults to the keyboard of the macro
+    return ((PRESS, device, codes),)
+
+
+def release(*codes, device=None):
+    return ((RELEASE, device, codes),)
+
+
+def tap(*codes, device=None):
+    return press(*codes, device=device) + release(*codes, device=device)
+
+
+def text(string):
+    return ((TEXT, None, string),)
+
+
+def delay(seconds):
+    return ((DELAY, None, seconds),)
+
+
+def ir(remote, code):
+    return ((IR, remote, code),)
+
+
+def compile_steps(steps, keyboard=None, layout=None):
+    """
+    Flatten the steps into (operation, device, argument) tuples.
+    Text is converted to keycodes here, the layout lookup being slow.
+    Key steps go through the report of their device, shared with the layers, see
+    src.hid.
+    """
+    compiled = []
+    for step in steps:
+        for operation, device, argument in step:
+            if operation == TEXT:
+                report = get_report(keyboard)
+                for char in argument:
+                    keycodes = layout.keycodes(char)
+                    compiled.append((PRESS, report, keycodes))
+                    compiled.append((RELEASE, report, keycodes))
+                continue
+
+            if operation in (PRESS, RELEASE):
+                device = device or keyboard
+                # the consumer control only releases its single code
+                if operation == RELEASE and isinstance(device, ConsumerControl):
+                    argument = ()
+                device = get_report(device)
+
+            compiled.append((operation, device, argument))
+
+    return tuple(compiled)
+
+
+class MacroRunner:
+    """
+    Runs compiled macros one step per call of `step`, in the order they were
+    started. Delays do not block: the runner just waits for their end.
+    """
+
+    def __init__(self, max_size=4):
+        self.max_size = max_size
+        self.pending = []
+        self.steps = ()
+        self.idx = 0
+        self.wait_until = 0.0
+
+    def __len__(self):
+        return len(self.pending) + bool(self.steps)
+
+    def start(self, steps):
+        if len(self.pending) < self.max_size:
+            self.pending.append(steps)
+
+    def clear(self):
+        self.pending.clear()
+        self.steps = ()
+        self.idx = 0
+        self.wait_until = 0.0
+
+    def step(self):
+        now = time.monotonic()
+        if now < self.wait_until:
+            return
+
+        if self.idx == len(self.steps):
+            # the macro ends after its trailing delay, if any
+            self.steps = ()
+            if not self.pending:
+                return
+            self.steps = self.pending.pop(0)
+            self.idx = 0
+
+        operation, device, argument = self.steps[self.idx]
+        if operation == PRESS:
+            device.press(*argument)
+        elif operation == RELEASE:
+            device.release(*argument)
+        elif operation == DELAY:
+            self.wait_until = now + argument
+        elif operation == IR:
+            device.enqueue(argument)
+
+        self.idx += 1
+        if self.idx == len(self.steps) and operation != DELAY:
+            self.steps = ()
+            self.idx = 0
+
+
+macro_runner = MacroRunner()
@@ -1,38 +1,132 @@
 import board
 from adafruit_itertools import chain_from_iterable
-from src.config import layers
-from src.control import LayerHandler
+from src.control import DebugLayer, IRAction, KeyboardLayer, LayerHandler, LazyLayer
+from src.ir_remotes.transmit import transmit_queue
 from src.keybow import Keybow
+from src.macro import macro_runner
+from src.power import PowerManager, is_busy
+from src.profiler import boot_timer, profiler
 from src.screen import Screen
 
 
 class MacroPad:
-    def __init__(self) -> None:
+    def __init__(self, profile=False, power_saving=True) -> None:
         self.i2c = board.I2C()
-        self.keybow = Keybow(led_sleep_time=5)
-        self.screen = Screen(128, 64, self.i2c)
+        self._instrumented_devices = set()
+        with boot_timer.measure("Keybow"):
+            self.keybow = Keybow(led_sleep_time=5)
+        self.power = PowerManager(self.keybow) if power_saving else None
+        with boot_timer.measure("Screen"):
+            self.screen = Screen(128, 64, self.i2c)
+
+        # see config.LAZY_LAYERS
+        with boot_timer.measure("import src.config"):
+            from src.config import layers
+
         self.layer_handler = LayerHandler(self)
-        self.layer_handler.add(*layers)
-        self.init_glyphs()
+        with boot_timer.measure("layers"):
+            self.layer_handler.add(*layers)
+        with boot_timer.measure("glyphs"):
+            self.init_glyphs()
+        with boot_timer.measure("layer screens"):
+            self.init_layer_groups()
+        with boot_timer.measure("IR pulses"):
+            self.init_ir_pulses()
+        if profile:
+            self.init_profiler()
 
     def init_glyphs(self):
         # ensure all glyphs are already loaded
         chars = set(
             chain_from_iterable(
-                action.label
-                for layer in self.layer_handler.layers
-                for action in layer.key_map.values()
+                label for layer in self.layer_handler.layers for label in layer.labels
             )
         )
         self.screen.load_glyphs(chars)
 
+    def init_layer_groups(self):
+        # render the screen of the first layers, so that selecting them is instant
+        layers = [
+            layer
+            for layer in self.layer_handler.layers
+            if not isinstance(layer, LazyLayer)
+        ]
+        for layer in layers[: self.screen.max_layer_groups]:
+            self.screen.layer_group(layer)
+
+    def init_ir_pulses(self, layers=None):
+        # encode all IR codes once, so that a key press only sends a prebuilt buffer
+        if layers is None:
+            layers = self.layer_handler.layers
+
+        codes = {}
+        for layer in layers:
+            for action in layer.key_map.values():
+                if isinstance(action, IRAction):
+                    codes.setdefault(action.hardware, []).append(action.code)
+
+        for remote, remote_codes in codes.items():
+            remote.warm_up(remote_codes)
+
+    def init_profiler(self):
+        # time each phase of the main loop, see src.profiler
+        profiler.instrument(self, "update_loop", "loop")
+        profiler.instrument(self.keybow, "read_switches", "switches")
+        profiler.instrument(self.keybow, "dispatch", "dispatch")
+        profiler.instrument(self.keybow._pixels, "show", "leds")
+        for method_name in (
+            "refresh",
+            "show_grid",
+            "show_layer",
+            "show_lines",
+            "print",
+            "clear",
+        ):
+            profiler.instrument(self.screen, method_name, "screen")
+        profiler.instrument(transmit_queue, "send_next", "ir")
+        profiler.instrument(macro_runner, "step", "macro")
+
+        self.instrument_hid(self.layer_handler.layers)
+        self.layer_handler.add(DebugLayer(profiler))
+
+    def instrument_hid(self, layers):
+        # devices are shared between layers, and only instrumented once
+        for layer in layers:
+            if not isinstance(layer, KeyboardLayer):
+                continue
+
+            for device in (layer.keyboard, layer.consumer_control):
+                if device in self._instrumented_devices:
+                    continue
+                self._instrumented_devices.add(device)
+                for method_name in ("press", "release", "release_all"):
+                    if hasattr(device, method_name):
+                        profiler.instrument(device, method_name, "hid")
+
+    def prepare_layer(self, layer):
+        """
+        Startup work of a layer built after the boot, see config.LAZY_LAYERS:
+        encode its IR codes, load its glyphs, render its screen and time its
+        HID devices
+        """
+        self.init_ir_pulses([layer])
+        self.screen.load_glyphs(set("".join(layer.labels)))
+        self.screen.layer_group(layer)
+        if profiler.enabled:
+            self.instrument_hid([layer])
+
     def handle_error(self):
+        self.keybow.animator.wake()
         for key in self.keybow.keys:
             key.lit = (255, 0, 0)
+        self.keybow.show()
 
     def update_layer(self):
         handler = self.layer_handler
         if handler.selector_key.held:
+            # keys pressed while selecting a layer are not meant for the layer
+            if handler.current_layer is not None:
+                handler.current_layer.skip_events()
             return
 
         # trigger actions depending on the layer
@@ -42,10 +136,22 @@ class MacroPad:
         elif not self.keybow.sleeping:
             handler.selector_key.lit = True
 
+    def update_loop(self):
+        self.keybow.update()
+        self.update_layer()
+        self.keybow.show()
+        macro_runner.step()
+        # at most one IR frame per iteration, keys are scanned in between
+        transmit_queue.send_next()
+        self.screen.refresh(busy=is_busy(self.keybow))
+
     def update(self):
         try:
-            self.keybow.update()
-            self.update_layer()
+            self.update_loop()
+            if profiler.enabled:
+                profiler.poll_console()
+            if self.power is not None:
+                self.power.wait()
 
         except Exception:
             self.handle_error()
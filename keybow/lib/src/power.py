@@ -0,0 +1,55 @@
+import time
+
+from src.ir_remotes.transmit import transmit_queue
+from src.macro import macro_runner
+
+
+try:
+    import alarm
+except ImportError:
+    alarm = None
+
+
+def is_busy(keybow):
+    """
+    Whether keys are used, or IR frames or macros are pending
+    """
+    return bool(
+        keybow.pressed_mask
+        or keybow.released_mask
+        or keybow.debouncing
+        or len(transmit_queue)
+        or len(macro_runner)
+    )
+
+
+class PowerManager:
+    """
+    Adapts the main loop rate: full rate while keys are used, a lower poll rate
+    once idle, and light sleep while the keybow sleeps, woken up by any switch.
+    """
+
+    def __init__(self, keybow, idle_after=1.0, idle_interval=0.02, light_sleep=True):
+        self.keybow = keybow
+        self.idle_after = idle_after
+        self.idle_interval = idle_interval
+        self.light_sleep = light_sleep and alarm is not None
+
+    def wait(self):
+        # call this at the end of each main loop iteration
+        if is_busy(self.keybow):
+            return
+
+        if self.keybow.sleeping and self.light_sleep:
+            self.sleep_until_pressed()
+
+        elif time.monotonic() - self.keybow._time_of_last_press > self.idle_after:
+            # the keypad backend keeps scanning while we sleep
+            time.sleep(self.idle_interval)
+
+    def sleep_until_pressed(self):
+        # pins can only be used by an alarm once released by the scanner
+        pins = self.keybow.suspend()
+        alarms = [alarm.pin.PinAlarm(pin, value=False, pull=True) for pin in pins]
+        woken_by = alarm.light_sleep_until_alarms(*alarms)
+        self.keybow.resume(getattr(woken_by, "pin", None))
@@ -0,0 +1,182 @@
+import sys
+import time
+from array import array
+
+
+try:
+    import supervisor
+except ImportError:
+    supervisor = None
+
+
+# upper bounds of the histogram bins, in us
+BINS = (100, 500, 1_000, 5_000, 10_000, 50_000, 100_000)
+
+
+class PhaseTimer:
+    """
+    Durations of the last `size` runs of a phase, in a fixed size ring buffer
+    """
+
+    def __init__(self, name, size=128):
+        self.name = name
+        self.size = size
+        self.samples = array("L", [0] * size)
+        self.idx = 0
+        self.count = 0
+        self.worst = 0
+
+    def add(self, duration_us):
+        self.samples[self.idx] = duration_us
+        self.idx = (self.idx + 1) % self.size
+        self.count += 1
+        if duration_us > self.worst:
+            self.worst = duration_us
+
+    def reset(self):
+        self.idx = self.count = self.worst = 0
+
+    @property
+    def values(self):
+        return self.samples[: min(self.count, self.size)]
+
+    def histogram(self):
+        counts = [0] * (len(BINS) + 1)
+        for value in self.values:
+            bin_idx = 0
+            while bin_idx < len(BINS) and value > BINS[bin_idx]:
+                bin_idx += 1
+            counts[bin_idx] += 1
+        return counts
+
+    def summary(self):
+        values = sorted(self.values)
+        if not values:
+            return f"{self.name} -"
+
+        mean = sum(values) // len(values)
+        p95 = values[min(len(values) - 1, (len(values) * 95) // 100)]
+        return f"{self.name} {mean}/{p95}/{self.worst}"
+
+
+class Profiler:
+    """
+    Per-phase timings of the main loop.
+    Methods are instrumented by wrapping them, so that a disabled profiler
+    costs nothing.
+    """
+
+    def __init__(self, size=128):
+        self.size = size
+        self.enabled = False
+        self.phases = {}
+
+    def phase(self, name):
+        if name not in self.phases:
+            self.phases[name] = PhaseTimer(name, self.size)
+        return self.phases[name]
+
+    def wrap(self, name, func):
+        timer = self.phase(name)
+
+        def _timed(*args, **kwargs):
+            start = time.monotonic_ns()
+            result = func(*args, **kwargs)
+            timer.add((time.monotonic_ns() - start) // 1000)
+            return result
+
+        return _timed
+
+    def instrument(self, obj, method_name, name):
+        """
+        Replace obj.method_name with a timed version, accounted in phase `name`
+        """
+        self.enabled = True
+        setattr(obj, method_name, self.wrap(name, getattr(obj, method_name)))
+
+    def reset(self):
+        for timer in self.phases.values():
+            timer.reset()
+
+    def report(self, limit=None):
+        """
+        One "phase mean/p95/worst" line per phase (in us), worst phases first
+        """
+        timers = sorted(self.phases.values(), key=lambda timer: -timer.worst)
+        return [timer.summary() for timer in timers[:limit]]
+
+    def dump(self):
+        print("phase mean/p95/worst (us)")
+        print("\n".join(self.report()))
+        print("histogram bins (us):", " ".join(str(bound) for bound in BINS), "+")
+        for timer in self.phases.values():
+            print(timer.name, timer.histogram())
+
+    def poll_console(self):
+        """
+        Commands read from the USB serial console: "p" dumps the timings,
+        "r" resets them
+        """
+        if supervisor is None or not supervisor.runtime.serial_bytes_available:
+            return
+
+        command = sys.stdin.read(1)
+        if command == "p":
+            self.dump()
+        elif command == "r":
+            self.reset()
+
+
+profiler = Profiler()
+
+
+class _Measure:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.entry = [timer.depth, name, None]
+
+    def __enter__(self):
+        self.timer.entries.append(self.entry)
+        self.timer.depth += 1
+        self.start = time.monotonic_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.entry[2] = (time.monotonic_ns() - self.start) // 1000
+        self.timer.depth -= 1
+        if self.timer.reported:
+            # built after the boot, e.g. a lazy layer
+            print(self.timer.format(self.entry))
+
+
+class BootTimer:
+    """
+    Durations of the imports and constructors run at startup, e.g.
+    with boot_timer.measure("import src.config"):
+        from src.config import layers
+    Nested measures are indented in the report.
+    """
+
+    def __init__(self):
+        # [depth, name, duration in us], in start order
+        self.entries = []
+        self.depth = 0
+        self.reported = False
+
+    def measure(self, name):
+        return _Measure(self, name)
+
+    @staticmethod
+    def format(entry):
+        depth, name, duration_us = entry
+        duration = "-" if duration_us is None else f"{duration_us // 1000} ms"
+        return f"{'  ' * depth}{name} {duration}"
+
+    def report(self):
+        print("boot times")
+        for entry in self.entries:
+            print(self.format(entry))
+        self.reported = True
+
+
+boot_timer = BootTimer()
@@ -0,0 +1,115 @@
+try:
+    import keypad
+except ImportError:
+    keypad = None
+
+
+POLLING = "polling"
+KEYPAD = "keypad"
+
+
+class PollingScanner:
+    """
+    Reads every switch on each call, pressed switches read False (pulled up)
+    """
+
+    # bounces are filtered by the keybow
+    debounced = False
+    # switches are read on each call
+    interval = 0.0
+
+    def __init__(self, pins):
+        # imported here, so that the keypad backend runs without digitalio
+        from digitalio import DigitalInOut, Pull
+
+        self.switches = []
+        for pin in pins:
+            switch = DigitalInOut(pin)
+            switch.pull = Pull.UP
+            self.switches.append(switch)
+        self.switches = tuple(self.switches)
+
+    def read(self) -> int:
+        state = 0
+        bit = 1
+        for switch in self.switches:
+            if not switch.value:
+                state |= bit
+            bit <<= 1
+        return state
+
+    def is_pressed(self, idx) -> bool:
+        return not self.switches[idx].value
+
+    def deinit(self):
+        for switch in self.switches:
+            switch.deinit()
+
+
+class KeypadScanner:
+    """
+    Switches are scanned and debounced in the background by the keypad module,
+    reading only drains its event queue.
+    """
+
+    debounced = True
+
+    def __init__(self, pins, interval=0.02, max_events=64):
+        self.interval = interval
+        self.keys = keypad.Keys(
+            pins,
+            value_when_pressed=False,
+            pull=True,
+            interval=interval,
+            max_events=max_events,
+        )
+        self._event = keypad.Event()
+        self._state = 0
+        # keys pressed and released since the previous read
+        self._deferred_releases = 0
+
+    def read(self) -> int:
+        # a tap shorter than a loop iteration is reported as pressed for one read
+        state = self._state & ~self._deferred_releases
+        self._deferred_releases = 0
+        pressed = 0
+
+        event = self._event
+        while self.keys.events.get_into(event):
+            bit = 1 << event.key_number
+            if event.pressed:
+                state |= bit
+                pressed |= bit
+                # pressed again after a short tap: still held
+                self._deferred_releases &= ~bit
+            elif pressed & bit:
+                self._deferred_releases |= bit
+            else:
+                state &= ~bit
+
+        if self.keys.events.overflowed:
+            # events were lost: after a reset, pressed keys are reported again
+            self.keys.events.clear()
+            self.keys.reset()
+            state = 0
+
+        self._state = state
+        return state
+
+    def is_pressed(self, idx) -> bool:
+        return bool(self._state & (1 << idx))
+
+    def deinit(self):
+        self.keys.deinit()
+
+
+def make_scanner(pins, backend=None):
+    """
+    keypad is used when available, unless the polling backend is requested
+    """
+    if backend == KEYPAD or (backend is None and keypad is not None):
+        if keypad is None:
+            raise ValueError("the keypad module is not available")
+        return KeypadScanner(tuple(pins))
+
+    return PollingScanner(pins)
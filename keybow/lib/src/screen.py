@@ -1,16 +1,29 @@
+import time
+from collections import OrderedDict
+
 import adafruit_displayio_ssd1306
 import displayio
 import terminalio
 from adafruit_bitmap_font import bitmap_font
 from adafruit_display_text import label, wrap_text_to_lines
 from adafruit_displayio_layout.layouts.grid_layout import GridLayout
+from src.font import GlyphFont
 from src.utils import number_to_xy
 
 FONT_FILE = "lib/waffle-10.bdf"
+# subset of FONT_FILE, built by misc/fonts/build_font.py
+GLYPH_FILE = "lib/waffle-10.bin"
 
 
 class Screen:
     def _init_font(self):
+        # precompiled subset of the icon font, with the default font as fallback
+        try:
+            self.font = GlyphFont(GLYPH_FILE, fallback=terminalio.FONT)
+            return
+        except OSError:
+            print(f"{GLYPH_FILE} does not exist, loading {FONT_FILE}")
+
         # load bitmap font with symbols, and merge it with default font
         try:
             self.font = bitmap_font.load_font(FONT_FILE)
@@ -28,22 +41,55 @@ class Screen:
     def load_glyphs(self, chars):
         self.font.load_glyphs([ord(char) for char in chars])
 
-    def __init__(self, width, height, i2c, address=0x3D):
+    def __init__(
+        self, width, height, i2c, address=0x3D, max_layer_groups=4, max_delay=0.1
+    ):
         # Initalize the display
         displayio.release_displays()
         self.width = width
         self.height = height
+        # refreshed by `refresh`, between key scans
         self.display = adafruit_displayio_ssd1306.SSD1306(
             displayio.I2CDisplay(i2c, device_address=address),
             width=self.width,
             height=self.height,
+            auto_refresh=False,
         )
+        self.max_delay = max_delay
+        self.dirty = False
+        self.dirty_since = 0.0
         self._init_font()
 
+        # layer -> its rendered group, least recently shown first
+        self.max_layer_groups = max_layer_groups
+        self._layer_groups = OrderedDict()
+
+    def _show(self, group):
+        self.display.show(group)
+        if not self.dirty:
+            self.dirty = True
+            self.dirty_since = time.monotonic()
+
+    def refresh(self, busy=False):
+        """
+        Send the changed areas of the display, once its content changed.
+        The transfer blocks the main loop, so it waits while the loop is busy
+        (keys pressed, IR frames or macros pending), at most max_delay.
+        """
+        if not self.dirty:
+            return
+
+        if busy and time.monotonic() - self.dirty_since < self.max_delay:
+            return
+
+        # False when called too soon after the previous refresh
+        if self.display.refresh(minimum_frames_per_second=0):
+            self.dirty = False
+
     def print(self, text: str):
         # Make the display context
         splash = displayio.Group()
-        self.display.show(splash)
+        self._show(splash)
 
         color_bitmap = displayio.Bitmap(self.width, self.height, 1)
         color_palette = displayio.Palette(1)
@@ -68,13 +114,26 @@ class Screen:
         text_area = label.Label(self.font, text=text, x=28, y=15)
         splash.append(text_area)
 
+    def show_lines(self, lines):
+        main_group = displayio.Group()
+        self._show(main_group)
+        text_area = label.Label(
+            self.font,
+            text="\n".join(lines),
+            anchor_point=(0, 0),
+            anchored_position=(0, 0),
+        )
+        main_group.append(text_area)
+
     def clear(self):
         splash = displayio.Group()
-        self.display.show(splash)
+        self._show(splash)
 
     def show_grid(self, content, title=None, size=4):
+        self._show(self.render_grid(content, title, size))
+
+    def render_grid(self, content, title=None, size=4):
         main_group = displayio.Group()
-        self.display.show(main_group)
         title_width = 16
         if title:
             title_area = label.Label(
@@ -116,13 +175,20 @@ class Screen:
             )
 
         main_group.append(layout)
-
-    def show_key_map(self, title, key_map):
-        labels = []
-        for i in range(4):
-            for j in range(4):
-                if (i, j) in key_map:
-                    labels.append(key_map.get((i, j)).label)
-                else:
-                    labels.append(" ")
-        self.show_grid(labels, title=title or None)
+        return main_group
+
+    def layer_group(self, layer):
+        """
+        Rendered group of a layer, at most max_layer_groups are kept in memory
+        """
+        groups = self._layer_groups
+        group = groups.pop(layer, None)
+        if group is None:
+            group = self.render_grid(layer.labels, title=layer.name or None)
+            if len(groups) >= self.max_layer_groups:
+                del groups[next(iter(groups))]
+        groups[layer] = group
+        return group
+
+    def show_layer(self, layer):
+        self._show(self.layer_group(layer))
@@ -12,6 +12,16 @@ def number_to_xy(idx, row_size):
     return (x, y)
 
 
+def iter_bits(mask):
+    # indices of the set bits of mask, lowest first
+    idx = 0
+    while mask:
+        if mask & 1:
+            yield idx
+        mask >>= 1
+        idx += 1
+
+
 class Matrix:
     def __init__(self, *iterable):
         # cannot inherit from tuple, as it does not have a __getitem__ method in circuitpython
@@ -50,3 +60,15 @@ def partial(func, *args, **kwargs):
         return func(*(args + more_args), **local_kwargs)
 
     return _partial
+
+
+def lazy(factory):
+    """Calls factory on first call only, and returns its result ever after"""
+    result = []
+
+    def _lazy():
+        if not result:
+            result.append(factory())
+        return result[0]
+
+    return _lazy
@@ -0,0 +1,64 @@
+"""
+Host-side fake of the IS31FL3731 driver of the Keybow 2040.
+Register and I2C writes are kept in Keybow2040.writes instead of being sent.
+"""
+
+
+class _I2CDevice:
+    def __init__(self, writes):
+        self.writes = writes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def write(self, buffer, start=0, end=None):
+        self.writes.append(("i2c", bytes(buffer[start:end])))
+
+
+# PWM register of each (key column, channel), as in the real driver
+_PIXEL_ADDRS = (
+    (120, 88, 104),
+    (136, 40, 72),
+    (112, 80, 96),
+    (128, 32, 64),
+    (121, 89, 105),
+    (137, 41, 73),
+    (113, 81, 97),
+    (129, 33, 65),
+    (122, 90, 106),
+    (138, 25, 74),
+    (114, 82, 98),
+    (130, 17, 66),
+    (123, 91, 107),
+    (139, 26, 75),
+    (115, 83, 99),
+    (131, 18, 67),
+)
+
+
+class Keybow2040:
+    def __init__(self, i2c, frames=None, address=0x74):
+        self.i2c = i2c
+        self.address = address
+        self.writes = []
+        self.i2c_device = _I2CDevice(self.writes)
+        self._frame = 0
+
+    @staticmethod
+    def pixel_addr(x, y):
+        return _PIXEL_ADDRS[x][y]
+
+    def _bank(self, bank=None):
+        self.writes.append(("bank", bank))
+
+    def _register(self, bank, register, value=None):
+        self.writes.append(("register", bank, register, value))
+
+    def frame(self, frame=None, show=True):
+        if frame is None:
+            return self._frame
+        self._frame = frame
+        self.writes.append(("frame", frame))
@@ -0,0 +1,17 @@
+"""
+Host-side fake of CircuitPython's board module for the Keybow 2040: pins are
+their names, and the I2C bus is only passed to the fake LED driver.
+"""
+
+
+for _idx in range(16):
+    globals()[f"SW{_idx}"] = f"SW{_idx}"
+INT = "INT"
+
+
+class _I2C:
+    pass
+
+
+def I2C():
+    return _I2C()
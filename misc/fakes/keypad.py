@@ -0,0 +1,94 @@
+"""
+Host-side fake of CircuitPython's keypad module, to run the keybow code under
+CPython: put this directory on the PYTHONPATH.
+Switches are driven with Keys.press / Keys.release instead of hardware.
+"""
+from collections import deque
+
+
+class Event:
+    def __init__(self, key_number=0, pressed=True, timestamp=None):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.timestamp = timestamp
+
+    @property
+    def released(self):
+        return not self.pressed
+
+    def __eq__(self, other):
+        return (self.key_number, self.pressed) == (other.key_number, other.pressed)
+
+    def __repr__(self):
+        state = "pressed" if self.pressed else "released"
+        return f"<Event: key_number {self.key_number} {state}>"
+
+
+class EventQueue:
+    def __init__(self, max_events):
+        self._events = deque()
+        self.max_events = max_events
+        self.overflowed = False
+
+    def _put(self, key_number, pressed):
+        if len(self._events) >= self.max_events:
+            self.overflowed = True
+            return
+        self._events.append((key_number, pressed))
+
+    def get(self):
+        if not self._events:
+            return None
+        return Event(*self._events.popleft())
+
+    def get_into(self, event):
+        if not self._events:
+            return False
+        event.key_number, event.pressed = self._events.popleft()
+        return True
+
+    def clear(self):
+        self._events.clear()
+        self.overflowed = False
+
+    def __bool__(self):
+        return bool(self._events)
+
+    def __len__(self):
+        return len(self._events)
+
+
+class Keys:
+    def __init__(
+        self,
+        pins,
+        *,
+        value_when_pressed,
+        pull=True,
+        interval=0.02,
+        max_events=64,
+    ):
+        self.key_count = len(pins)
+        self.value_when_pressed = value_when_pressed
+        self.interval = interval
+        self.events = EventQueue(max_events)
+        self._pressed = [False] * self.key_count
+
+    def press(self, key_number):
+        if not self._pressed[key_number]:
+            self._pressed[key_number] = True
+            self.events._put(key_number, True)
+
+    def release(self, key_number):
+        if self._pressed[key_number]:
+            self._pressed[key_number] = False
+            self.events._put(key_number, False)
+
+    def reset(self):
+        # pressed keys are reported again, as on the hardware
+        for key_number, pressed in enumerate(self._pressed):
+            if pressed:
+                self.events._put(key_number, True)
+
+    def deinit(self):
+        self.events.clear()
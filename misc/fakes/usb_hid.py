@@ -0,0 +1,38 @@
+"""
+Host-side fake of CircuitPython's usb_hid module, so that adafruit_hid can be
+imported under CPython (Blinka's usb_hid needs a USB gadget kernel module).
+Reports sent by a device are kept in Device.reports.
+"""
+
+
+class Device:
+    def __init__(
+        self,
+        *,
+        descriptor=b"",
+        usage_page,
+        usage,
+        report_ids=(0,),
+        in_report_lengths=(0,),
+        out_report_lengths=(0,),
+    ):
+        self.descriptor = descriptor
+        self.usage_page = usage_page
+        self.usage = usage
+        self.report_ids = report_ids
+        self.in_report_lengths = in_report_lengths
+        self.out_report_lengths = out_report_lengths
+        self.reports = []
+
+    def send_report(self, report, report_id=None):
+        self.reports.append(bytes(report))
+
+    def get_last_received_report(self, report_id=None):
+        return None
+
+
+Device.KEYBOARD = Device(usage_page=0x01, usage=0x06, in_report_lengths=(8,))
+Device.MOUSE = Device(usage_page=0x01, usage=0x02, in_report_lengths=(4,))
+Device.CONSUMER_CONTROL = Device(usage_page=0x0C, usage=0x01, in_report_lengths=(2,))
+
+devices = (Device.KEYBOARD, Device.MOUSE, Device.CONSUMER_CONTROL)
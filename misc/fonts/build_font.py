@@ -0,0 +1,164 @@
+"""
+Subset the BDF font to the glyphs used by the layer labels of config.py, plus
+printable ASCII, and compile it into a binary glyph table, read at runtime by
+`src.font.GlyphFont`.
+"""
+import argparse
+import ast
+import pathlib
+import sys
+
+
+ROOT_DIR = pathlib.Path(__file__).parents[2]
+LIB_DIR = ROOT_DIR / "keybow" / "lib"
+sys.path.insert(0, str(LIB_DIR / "src"))
+
+from glyph_table import row_size, write_table  # noqa: E402
+
+
+FONT_FILE = LIB_DIR / "waffle-10.bdf"
+CONFIG_FILE = LIB_DIR / "src" / "config.py"
+OUTPUT_FILE = LIB_DIR / "waffle-10.bin"
+ASCII = range(32, 127)
+
+
+def _literal_label(node):
+    """
+    Value of a label expression made of strings, chr(int) calls and +,
+    None for anything else
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == "chr"
+        and len(node.args) == 1
+        and isinstance(node.args[0], ast.Constant)
+    ):
+        return chr(node.args[0].value)
+
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left, right = _literal_label(node.left), _literal_label(node.right)
+        if left is not None and right is not None:
+            return left + right
+
+    return None
+
+
+def config_labels(filepath):
+    """
+    Labels of the actions of config.py, read from its source: the config cannot be
+    imported outside of the keybow
+    """
+    labels = []
+    for node in ast.walk(ast.parse(pathlib.Path(filepath).read_text())):
+        if not (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id.endswith("Action")
+        ):
+            continue
+
+        candidates = [
+            keyword.value for keyword in node.keywords if keyword.arg == "label"
+        ]
+        if len(node.args) >= 3:
+            candidates.append(node.args[2])
+        for candidate in candidates:
+            label = _literal_label(candidate)
+            if label is None:
+                print(f"ignoring label at line {node.lineno}", file=sys.stderr)
+            else:
+                labels.append(label)
+
+    return labels
+
+
+def _bdf_lines(filepath):
+    # some glyphs of the font miss the line break after BITMAP
+    for line in pathlib.Path(filepath).read_text().splitlines():
+        line = line.strip()
+        if line.startswith("BITMAP") and line != "BITMAP":
+            yield "BITMAP"
+            line = line[len("BITMAP") :]
+        yield line
+
+
+def _is_hex(row):
+    return bool(row) and all(char in "0123456789abcdefABCDEF" for char in row)
+
+
+def parse_bdf(filepath):
+    """
+    return the bounding box, the ascent, the descent and a
+    {code point: (width, height, dx, dy, shift_x, bitmap bytes)} dict
+    Glyphs with a truncated bitmap are skipped.
+    """
+    bounding_box = None
+    ascent = descent = 0
+    glyphs = {}
+    lines = list(_bdf_lines(filepath))
+    idx = 0
+    while idx < len(lines):
+        fields = lines[idx].split()
+        idx += 1
+        if not fields:
+            continue
+
+        keyword = fields[0]
+        if keyword == "FONTBOUNDINGBOX":
+            bounding_box = tuple(int(value) for value in fields[1:5])
+        elif keyword == "FONT_ASCENT":
+            ascent = int(fields[1])
+        elif keyword == "FONT_DESCENT":
+            descent = int(fields[1])
+        elif keyword == "ENCODING":
+            code_point = int(fields[1])
+        elif keyword == "DWIDTH":
+            shift_x = int(fields[1])
+        elif keyword == "BBX":
+            width, height, dx, dy = (int(value) for value in fields[1:5])
+        elif keyword == "BITMAP":
+            rows = lines[idx : idx + height]
+            if len(rows) < height or not all(_is_hex(row) for row in rows):
+                print(f"skipping truncated glyph {hex(code_point)}", file=sys.stderr)
+                continue
+
+            idx += height
+            size = row_size(width)
+            # rows may be padded to more bytes than the glyph width needs
+            bitmap = b"".join(bytes.fromhex(row)[:size] for row in rows)
+            glyphs[code_point] = (width, height, dx, dy, shift_x, bitmap)
+
+    if bounding_box is None:
+        raise ValueError(f"{filepath} has no FONTBOUNDINGBOX")
+    return bounding_box, ascent, descent, glyphs
+
+
+def build(font_path, config_path, output_path):
+    code_points = set(ASCII)
+    for label in config_labels(config_path):
+        code_points.update(ord(char) for char in label)
+
+    bounding_box, ascent, descent, glyphs = parse_bdf(font_path)
+    subset = {
+        code_point: glyph
+        for code_point, glyph in glyphs.items()
+        if code_point in code_points
+    }
+    with open(output_path, "wb") as table:
+        write_table(table, bounding_box, ascent, descent, subset)
+
+    # the other chars are taken from the default font at runtime
+    print(f"{output_path}: {len(subset)}/{len(glyphs)} glyphs")
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-f", "--font", type=pathlib.Path, default=FONT_FILE)
+parser.add_argument("-c", "--config", type=pathlib.Path, default=CONFIG_FILE)
+parser.add_argument("-o", "--output", type=pathlib.Path, default=OUTPUT_FILE)
+if __name__ == "__main__":
+    args = parser.parse_args()
+    build(args.font, args.config, args.output)
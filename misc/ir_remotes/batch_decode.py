@@ -0,0 +1,307 @@
+"""
+Decode large sets of ir-ctl captures at once.
+Captures are padded into a 2D array, classified by protocol and decoded with numpy,
+one pass per protocol. Errors are reported per capture instead of being raised.
+"""
+import argparse
+import pathlib
+import sys
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+
+IR_REMOTES_DIR = (
+    pathlib.Path(__file__).parents[2] / "keybow" / "lib" / "src" / "ir_remotes"
+)
+sys.path.insert(0, str(IR_REMOTES_DIR))
+
+from encoders.lumene import LUMENE, LUMENE_NBITS, LUMENE_UNIT  # noqa: E402
+from encoders.nec import (  # noqa: E402
+    NEC,
+    NEC_BIT_0_SPACE,
+    NEC_BIT_1_SPACE,
+    NEC_BIT_PULSE,
+    NEC_HEADER_PULSE,
+    NEC_HEADER_SPACE,
+    NEC_NBITS,
+    NEC_TRAILER_PULSE,
+    NEC_UNIT,
+)
+from encoders.rc5 import RC5, RC5_NBITS, RC5_UNIT  # noqa: E402
+
+
+UNKNOWN = "unknown"
+PROTOCOLS = (UNKNOWN, NEC, RC5, LUMENE)
+PROTOCOL_UNKNOWN, PROTOCOL_NEC, PROTOCOL_RC5, PROTOCOL_LUMENE = range(len(PROTOCOLS))
+
+# error codes
+OK = 0
+UNKNOWN_PROTOCOL = 1
+BAD_LENGTH = 2
+BAD_HEADER = 3
+BAD_TIMING = 4
+BAD_START_BITS = 5
+ERRORS = (
+    "ok",
+    "unknown protocol",
+    "bad length",
+    "bad header",
+    "bad timing",
+    "bad start bits",
+)
+
+NEC_LENGTH = 2 * NEC_NBITS + 3
+LUMENE_LENGTH = 2 * LUMENE_NBITS
+RC5_HALF_BITS = 2 * RC5_NBITS
+
+BatchResult = namedtuple("BatchResult", ["protocols", "scancodes", "errors"])
+
+
+def near(values, target, margin):
+    return numpy.abs(values - target) <= margin
+
+
+def to_matrix(captures):
+    """
+    Pad a list of captures into a 2D array, missing pulses are 0
+    """
+    width = max((len(capture) for capture in captures), default=0)
+    matrix = numpy.zeros((len(captures), width), dtype=numpy.int32)
+    for row, capture in enumerate(captures):
+        matrix[row, : len(capture)] = numpy.abs(capture)
+    return matrix
+
+
+def classify(matrix):
+    lengths = numpy.count_nonzero(matrix, axis=1)
+    first = matrix[:, 0] if matrix.shape[1] else numpy.zeros(len(matrix))
+
+    protocols = numpy.full(len(matrix), PROTOCOL_UNKNOWN, dtype=numpy.int8)
+    nec = near(first, NEC_HEADER_PULSE, 4 * NEC_UNIT)
+    # lumene and rc5 timings overlap, but not their lengths
+    lumene = ((lengths == LUMENE_LENGTH) | (lengths == LUMENE_LENGTH - 1)) & (
+        near(first, LUMENE_UNIT, LUMENE_UNIT / 2)
+        | near(first, 3 * LUMENE_UNIT, LUMENE_UNIT / 2)
+    )
+    rc5 = (lengths <= RC5_HALF_BITS - 1) & (
+        near(first, RC5_UNIT, RC5_UNIT / 2) | near(first, 2 * RC5_UNIT, RC5_UNIT / 2)
+    )
+    protocols[rc5] = PROTOCOL_RC5
+    protocols[lumene] = PROTOCOL_LUMENE
+    protocols[nec] = PROTOCOL_NEC
+    return protocols, lengths
+
+
+def decode_nec(matrix, lengths):
+    """
+    Same result as encoders.nec.pulses_to_scancode
+    """
+    errors = numpy.zeros(len(matrix), dtype=numpy.int8)
+    scancodes = numpy.zeros(len(matrix), dtype=numpy.int64)
+    if not len(matrix):
+        return scancodes, errors
+
+    margin = NEC_UNIT / 2
+    pulses = numpy.zeros((len(matrix), NEC_LENGTH), dtype=numpy.int32)
+    width = min(NEC_LENGTH, matrix.shape[1])
+    pulses[:, :width] = matrix[:, :width]
+
+    header_ok = (
+        near(pulses[:, 0], NEC_HEADER_PULSE, margin)
+        & near(pulses[:, 1], NEC_HEADER_SPACE, margin)
+        & near(pulses[:, -1], NEC_TRAILER_PULSE, margin)
+    )
+    marks = pulses[:, 2:-1:2]
+    spaces = pulses[:, 3:-1:2]
+    is_one = near(spaces, NEC_BIT_1_SPACE, margin)
+    timing_ok = near(marks, NEC_BIT_PULSE, margin).all(axis=1) & (
+        is_one | near(spaces, NEC_BIT_0_SPACE, margin)
+    ).all(axis=1)
+
+    # bits are sent lsb first: received bit k of byte j has weight 2**k
+    weights = numpy.left_shift(1, numpy.arange(8, dtype=numpy.int64))
+    nec_bytes = (is_one.reshape(-1, 4, 8) * weights).sum(axis=2)
+    address, not_address, command, not_command = nec_bytes.T
+
+    # see encoders.nec.nec_bytes_to_scancode
+    scancodes = numpy.where(
+        command ^ not_command != 0xFF,
+        not_address << 24 | address << 16 | not_command << 8 | command,
+        numpy.where(
+            address ^ not_address != 0xFF,
+            address << 16 | not_address << 8 | command,
+            address << 8 | command,
+        ),
+    )
+
+    errors[~timing_ok] = BAD_TIMING
+    errors[~header_ok] = BAD_HEADER
+    errors[lengths != NEC_LENGTH] = BAD_LENGTH
+    scancodes[errors != OK] = 0
+    return scancodes, errors
+
+
+def decode_rc5(matrix, lengths):
+    """
+    Same result as encoders.rc5.pulses_to_scancode, as address << 8 | command
+    """
+    errors = numpy.zeros(len(matrix), dtype=numpy.int8)
+    scancodes = numpy.zeros(len(matrix), dtype=numpy.int64)
+    if not len(matrix):
+        return scancodes, errors
+
+    margin = RC5_UNIT / 2
+    present = matrix > 0
+    single = near(matrix, RC5_UNIT, margin) & present
+    double = near(matrix, 2 * RC5_UNIT, margin) & present
+    timing_ok = (single | double | ~present).all(axis=1)
+
+    # each pulse lasts 1 or 2 half bits, after the initial half bit space
+    counts = numpy.where(double, 2, numpy.where(single, 1, 0))
+    total = 1 + counts.sum(axis=1)
+    length_ok = (total == RC5_HALF_BITS) | (total == RC5_HALF_BITS - 1)
+
+    # marks (even pulses) are +1, spaces and missing half bits are -1
+    half_bits = numpy.full((len(matrix), RC5_HALF_BITS + 2), -1, dtype=numpy.int8)
+    starts = 1 + numpy.cumsum(counts, axis=1) - counts
+    marks = numpy.zeros_like(present)
+    marks[:, ::2] = True
+    rows = numpy.broadcast_to(numpy.arange(len(matrix))[:, None], counts.shape)
+    for offset in (0, 1):
+        selected = marks & (counts > offset)
+        columns = numpy.minimum(starts[selected] + offset, RC5_HALF_BITS + 1)
+        half_bits[rows[selected], columns] = 1
+
+    bits = (half_bits[:, :RC5_HALF_BITS:2] == -1).astype(numpy.int64)
+    start_ok = (bits[:, 0] == 1) & (bits[:, 1] == 1)
+
+    weights = numpy.left_shift(1, numpy.arange(5, -1, -1, dtype=numpy.int64))
+    address = (bits[:, 3:8] * weights[1:]).sum(axis=1)
+    command = (bits[:, 8:] * weights).sum(axis=1)
+    scancodes = address << 8 | command
+
+    errors[~start_ok] = BAD_START_BITS
+    errors[~length_ok] = BAD_LENGTH
+    errors[~timing_ok] = BAD_TIMING
+    scancodes[errors != OK] = 0
+    return scancodes, errors
+
+
+def decode_lumene(matrix, lengths):
+    """
+    Same result as encoders.lumene.pulses_to_lumene_code, as an int
+    """
+    errors = numpy.zeros(len(matrix), dtype=numpy.int8)
+    scancodes = numpy.zeros(len(matrix), dtype=numpy.int64)
+    if not len(matrix):
+        return scancodes, errors
+
+    margin = LUMENE_UNIT / 2
+    pulses = numpy.zeros((len(matrix), LUMENE_LENGTH), dtype=numpy.int32)
+    width = min(LUMENE_LENGTH, matrix.shape[1])
+    pulses[:, :width] = matrix[:, :width]
+
+    marks = pulses[:, ::2]
+    # the last space may not have been registered
+    spaces = pulses[:, 1::2].copy()
+    spaces[:, -1] = numpy.where(
+        spaces[:, -1] == 0, 4 * LUMENE_UNIT - marks[:, -1], spaces[:, -1]
+    )
+
+    is_one = near(marks, LUMENE_UNIT, margin) & near(spaces, 3 * LUMENE_UNIT, margin)
+    is_zero = near(marks, 3 * LUMENE_UNIT, margin) & near(spaces, LUMENE_UNIT, margin)
+    timing_ok = (is_one | is_zero).all(axis=1)
+
+    # msb first
+    weights = numpy.left_shift(
+        1, numpy.arange(LUMENE_NBITS - 1, -1, -1, dtype=numpy.int64)
+    )
+    scancodes = (is_one * weights).sum(axis=1)
+
+    errors[~timing_ok] = BAD_TIMING
+    errors[(lengths != LUMENE_LENGTH) & (lengths != LUMENE_LENGTH - 1)] = BAD_LENGTH
+    scancodes[errors != OK] = 0
+    return scancodes, errors
+
+
+DECODERS = {
+    PROTOCOL_NEC: decode_nec,
+    PROTOCOL_RC5: decode_rc5,
+    PROTOCOL_LUMENE: decode_lumene,
+}
+
+
+def decode_batch(captures):
+    """
+    Decode a 2D array (or a list) of captures.
+    Returns the protocol index (in PROTOCOLS), the scancode and the error code
+    (in ERRORS) of each capture.
+    """
+    matrix = captures if isinstance(captures, numpy.ndarray) else to_matrix(captures)
+    matrix = numpy.abs(matrix)
+    protocols, lengths = classify(matrix)
+
+    scancodes = numpy.zeros(len(matrix), dtype=numpy.int64)
+    errors = numpy.full(len(matrix), UNKNOWN_PROTOCOL, dtype=numpy.int8)
+    for protocol, decoder in DECODERS.items():
+        rows = protocols == protocol
+        scancodes[rows], errors[rows] = decoder(matrix[rows], lengths[rows])
+
+    return BatchResult(protocols, scancodes, errors)
+
+
+def read_captures(filepath):
+    """
+    Read a capture file: one capture per line, ir-ctl style (+889 -889 ...)
+    or plain values, followed by an optional # comment
+    """
+    captures = []
+    with open(filepath) as input_file:
+        for line in input_file:
+            values = line.split("#")[0].split()
+            if values:
+                captures.append([abs(int(value)) for value in values])
+    return captures
+
+
+def decode_file(filepath):
+    return decode_batch(read_captures(filepath))
+
+
+def decode_files(filepaths, workers=None):
+    """
+    Decode capture files, sharded across a process pool when workers > 1
+    """
+    if workers == 1:
+        results = list(map(decode_file, filepaths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(decode_file, filepaths))
+
+    if not results:
+        empty = numpy.zeros(0, dtype=numpy.int64)
+        return BatchResult(empty, empty, empty)
+
+    return BatchResult(*(numpy.concatenate(values) for values in zip(*results)))
+
+
+def summarize(result):
+    counter = Counter(
+        (PROTOCOLS[protocol], hex(scancode), ERRORS[error])
+        for protocol, scancode, error in zip(*result)
+    )
+    for (protocol, scancode, error), count in counter.most_common():
+        print(f"{count:>8} {protocol:<8} {scancode:<12} {error}")
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("paths", type=pathlib.Path, nargs="+")
+parser.add_argument("-j", "--workers", type=int, default=None)
+if __name__ == "__main__":
+    args = parser.parse_args()
+    filepaths = []
+    for path in args.paths:
+        filepaths.extend(sorted(path.glob("*")) if path.is_dir() else [path])
+    summarize(decode_files(filepaths, args.workers))
@@ -0,0 +1,140 @@
+"""
+Check that the table-driven PulseEncoder produces exactly the same pulses as
+generate_pulses, for every code declared in the remotes, and time both.
+"""
+import argparse
+import ast
+import pathlib
+import sys
+import timeit
+from array import array
+
+
+IR_REMOTES_DIR = (
+    pathlib.Path(__file__).parents[2] / "keybow" / "lib" / "src" / "ir_remotes"
+)
+sys.path.insert(0, str(IR_REMOTES_DIR))
+
+from encoders.lumene import (  # noqa: E402
+    LUMENE,
+    LUMENE_BIT_0,
+    LUMENE_BIT_1,
+    LUMENE_NBITS,
+    lumene_scancode_to_pulses,
+)
+from encoders.nec import (  # noqa: E402
+    NEC,
+    NEC_BIT_0_SPACE,
+    NEC_BIT_1_SPACE,
+    NEC_BIT_PULSE,
+    NEC_HEADER_PULSE,
+    NEC_HEADER_SPACE,
+    NEC_NBITS,
+    NEC_TRAILER_PULSE,
+    NECX,
+    nec_scancode_to_bits,
+    nec_scancode_to_pulses,
+)
+from encoders.utils import IRValue, generate_pulses  # noqa: E402
+
+
+# base classes of remote.py, and the protocol they implement
+BASE_PROTOCOLS = {"NECRemote": NEC, "NECXRemote": NECX, "Lumene": LUMENE}
+
+
+def get_remote_codes(filepath=IR_REMOTES_DIR / "remote.py"):
+    """
+    Read the `Code` classes of remote.py without importing it (it needs pulseio)
+    """
+    tree = ast.parse(filepath.read_text())
+    bases = {}
+    codes = {}
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+
+        bases[node.name] = [base.id for base in node.bases]
+        for child in node.body:
+            if isinstance(child, ast.ClassDef) and child.name == "Code":
+                codes[node.name] = {
+                    target.id: ast.literal_eval(assign.value)
+                    for assign in child.body
+                    if isinstance(assign, ast.Assign)
+                    for target in assign.targets
+                }
+
+    def get_protocol(name):
+        if name in BASE_PROTOCOLS:
+            return BASE_PROTOCOLS[name]
+        for base in bases.get(name, []):
+            if protocol := get_protocol(base):
+                return protocol
+        return None
+
+    return {
+        name: (protocol, remote_codes)
+        for name, remote_codes in codes.items()
+        if (protocol := get_protocol(name)) is not None
+    }
+
+
+def reference_pulses(protocol, code):
+    if protocol == LUMENE:
+        pulses = generate_pulses(
+            one=LUMENE_BIT_1, zero=LUMENE_BIT_0, nbits=LUMENE_NBITS, data=code
+        )
+    else:
+        pulses = generate_pulses(
+            one=IRValue(NEC_BIT_PULSE, NEC_BIT_1_SPACE),
+            zero=IRValue(NEC_BIT_PULSE, NEC_BIT_0_SPACE),
+            nbits=NEC_NBITS,
+            data=nec_scancode_to_bits(code, protocol),
+            header=IRValue(NEC_HEADER_PULSE, NEC_HEADER_SPACE),
+            msb=False,
+            trailer=NEC_TRAILER_PULSE,
+        )
+    return array("H", pulses)
+
+
+def table_pulses(protocol, code, buffer=None):
+    if protocol == LUMENE:
+        return lumene_scancode_to_pulses(code, buffer)
+    return nec_scancode_to_pulses(code, protocol, buffer)
+
+
+def check(remotes):
+    count = 0
+    for name, (protocol, codes) in remotes.items():
+        for code_name, code in codes.items():
+            expected = reference_pulses(protocol, code).tobytes()
+            actual = table_pulses(protocol, code).tobytes()
+            if expected != actual:
+                raise AssertionError(f"{name}.Code.{code_name} differs ({hex(code)})")
+            count += 1
+    return count
+
+
+def bench(remotes, number):
+    for name, (protocol, codes) in remotes.items():
+        code = next(iter(codes.values()))
+        buffer = table_pulses(protocol, code)
+        reference = timeit.timeit(
+            lambda: reference_pulses(protocol, code), number=number
+        )
+        table = timeit.timeit(
+            lambda: table_pulses(protocol, code, buffer), number=number
+        )
+        print(
+            f"{name:<10} {protocol:<7}",
+            f"generate_pulses: {reference / number * 1e6:7.2f} us",
+            f"PulseEncoder: {table / number * 1e6:7.2f} us",
+        )
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-n", "--number", type=int, default=10_000)
+if __name__ == "__main__":
+    args = parser.parse_args()
+    remotes = get_remote_codes()
+    print(f"{check(remotes)} codes encoded identically")
+    bench(remotes, args.number)
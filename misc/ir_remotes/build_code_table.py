@@ -0,0 +1,189 @@
+"""
+Compile the remote definitions of config/*.toml into binary code tables,
+read at runtime by `src.ir_remotes.table.TableRemote`.
+"""
+import argparse
+import pathlib
+import re
+import sys
+
+
+ROOT_DIR = pathlib.Path(__file__).parents[2]
+IR_REMOTES_DIR = ROOT_DIR / "keybow" / "lib" / "src" / "ir_remotes"
+sys.path.insert(0, str(IR_REMOTES_DIR))
+
+from code_table import write_table  # noqa: E402
+from encoders.lumene import (  # noqa: E402
+    LUMENE,
+    LUMENE_CARRIER,
+    lumene_scancode_to_pulses,
+    pulses_to_lumene_code,
+)
+from encoders.nec import (  # noqa: E402
+    NEC,
+    NEC32,
+    NEC_CARRIER,
+    NECX,
+    nec_scancode_to_pulses,
+    pulses_to_scancode,
+)
+from encoders.rc5 import RC5, RC5_CARRIER, rc5_scancode_to_pulses  # noqa: E402
+from encoders.utils import parse_ir_ctl_string  # noqa: E402
+
+
+CONFIG_DIR = pathlib.Path(__file__).parent / "config"
+OUTPUT_DIR = ROOT_DIR / "keybow" / "lib" / "ir_codes"
+
+
+def _decode_nec(pulses):
+    return pulses_to_scancode(pulses)
+
+
+def _decode_lumene(pulses):
+    return int(pulses_to_lumene_code(pulses), 16)
+
+
+# (protocol, variant) -> (protocol name, carrier, encoder, decoder)
+PROTOCOLS = {
+    ("nec", "nec"): (
+        NEC,
+        NEC_CARRIER,
+        lambda code: nec_scancode_to_pulses(code, NEC),
+        _decode_nec,
+    ),
+    ("nec", "nec-x"): (
+        NECX,
+        NEC_CARRIER,
+        lambda code: nec_scancode_to_pulses(code, NECX),
+        _decode_nec,
+    ),
+    ("nec", "nec-32"): (
+        NEC32,
+        NEC_CARRIER,
+        lambda code: nec_scancode_to_pulses(code, NEC32),
+        _decode_nec,
+    ),
+    ("rc5", None): (RC5, RC5_CARRIER, rc5_scancode_to_pulses, None),
+    ("lumene", None): (
+        LUMENE,
+        LUMENE_CARRIER,
+        lumene_scancode_to_pulses,
+        _decode_lumene,
+    ),
+    # raw captures of remotes with a custom encoder, matched by remote name
+    ("raw", LUMENE): (
+        LUMENE,
+        LUMENE_CARRIER,
+        lumene_scancode_to_pulses,
+        _decode_lumene,
+    ),
+}
+
+
+def _parse_value(raw):
+    raw = raw.strip()
+    if len(raw) >= 2 and raw[0] == raw[-1] and raw[0] in "\"'":
+        return raw[1:-1]
+    return raw
+
+
+def parse_config(filepath):
+    """
+    Parse a remote config file.
+    They look like TOML, but values are not always quoted, so tomllib rejects them.
+    """
+    remotes = []
+    remote = None
+    section = None
+    for line in pathlib.Path(filepath).read_text().splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        if line.startswith("["):
+            section = line.strip("[]").strip()
+            if section == "protocols":
+                remote = {"scancodes": {}, "raw": []}
+                remotes.append(remote)
+            elif section == "protocols.raw":
+                remote["raw"].append({})
+            continue
+
+        key, sep, value = line.partition("=")
+        if not sep or remote is None:
+            continue
+
+        key = _parse_value(key)
+        # values with spaces may not be quoted, so comments are stripped first
+        if section != "protocols.raw":
+            value = value.split("#")[0]
+        value = _parse_value(value)
+
+        if section == "protocols":
+            remote[key] = value
+        elif section == "protocols.scancodes":
+            try:
+                remote["scancodes"][int(key, 0)] = value
+            except ValueError:
+                print(f"{filepath}: ignoring scancode {key!r}", file=sys.stderr)
+        elif section == "protocols.raw":
+            remote["raw"][-1][key] = value
+
+    return remotes
+
+
+def get_protocol(remote):
+    protocol = remote["protocol"].lower()
+    if protocol == "raw":
+        return PROTOCOLS.get((protocol, remote["name"].lower()))
+    return PROTOCOLS.get((protocol, remote.get("variant")))
+
+
+def compile_remote(remote):
+    """
+    return the protocol, the carrier and a {code: (name, pulses)} dict
+    """
+    protocol = get_protocol(remote)
+    if protocol is None:
+        raise ValueError(f"unsupported protocol for {remote['name']}")
+
+    protocol_name, carrier, encoder, decoder = protocol
+    entries = {
+        code: (name, list(encoder(code))) for code, name in remote["scancodes"].items()
+    }
+
+    # raw captures are sent as is, unless their code is already known
+    for raw in remote["raw"]:
+        pulses = parse_ir_ctl_string(raw["raw"])
+        try:
+            code = decoder(pulses)
+        except Exception as exc:
+            print(f"cannot decode {raw.get('keycode')}: {exc!r}", file=sys.stderr)
+            continue
+
+        entries.setdefault(code, (raw.get("keycode", ""), pulses))
+
+    return protocol_name, carrier, entries
+
+
+def table_name(remote_name):
+    return re.sub(r"\W+", "_", remote_name.split("#")[0].strip().lower()).strip("_")
+
+
+def build(config_dir, output_dir):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for config_path in sorted(config_dir.glob("*.toml")):
+        for remote in parse_config(config_path):
+            protocol, carrier, entries = compile_remote(remote)
+            filepath = output_dir / f"{table_name(remote['name'])}.bin"
+            with open(filepath, "wb") as table:
+                write_table(table, protocol, carrier, entries)
+            print(f"{filepath}: {len(entries)} codes ({protocol})")
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-c", "--config-dir", type=pathlib.Path, default=CONFIG_DIR)
+parser.add_argument("-o", "--output-dir", type=pathlib.Path, default=OUTPUT_DIR)
+if __name__ == "__main__":
+    args = parser.parse_args()
+    build(args.config_dir, args.output_dir)
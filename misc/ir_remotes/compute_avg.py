@@ -1,26 +1,122 @@
 import argparse
 import pathlib
-from statistics import mean
+from collections import namedtuple
 
+import numpy
 
-def compute_avg(filepath):
+
+CHUNK_SIZE = 1024
+
+GroupStats = namedtuple(
+    "GroupStats", ["length", "count", "kept", "mean", "median", "variance"]
+)
+
+
+class _Group:
+    """
+    Captures of a given length, stored in a growing 2D array
+    """
+
+    def __init__(self, length):
+        self.values = numpy.empty((CHUNK_SIZE, length), dtype=numpy.int32)
+        self.count = 0
+
+    def append(self, values):
+        if self.count == len(self.values):
+            # double the capacity
+            self.values = numpy.concatenate(
+                [self.values, numpy.empty_like(self.values)]
+            )
+        self.values[self.count] = values
+        self.count += 1
+
+    @property
+    def captures(self):
+        return self.values[: self.count]
+
+
+def read_groups(filepath):
+    """
+    Stream a capture file, grouping captures by frame length
+    """
+    groups = {}
     with open(filepath) as input_file:
-        first_line = input_file.readline()
-        signal_length = len(first_line.split("#")[0].strip().split())
-        input_file.seek(0)
-        result = [[] for _ in range(signal_length)]
         for line in input_file:
-            values = line.split("#")[0].strip().split()
-            if len(values) != signal_length:
+            values = line.split("#")[0].split()
+            if not values:
                 continue
-            for idx, value in enumerate(values):
-                result[idx].append(int(value))
 
-        return [int(mean(val)) for val in result]
+            if len(values) not in groups:
+                groups[len(values)] = _Group(len(values))
+            groups[len(values)].append([abs(int(value)) for value in values])
+
+    return groups
+
+
+def group_stats(captures, trim=0.1, max_deviation=3.0, tolerance=0.1):
+    """
+    Reject captures with a pulse further than `max_deviation` scaled MADs from the
+    median of its position, then compute the trimmed mean, median and variance of
+    each position on the remaining captures.
+    Pulses within `tolerance` (a fraction of the median) are always accepted: with
+    quantized timings the MAD of a position is often 0.
+    """
+    median = numpy.median(captures, axis=0)
+    deviation = numpy.abs(captures - median)
+    # scaled median absolute deviation
+    mad = 1.4826 * numpy.median(deviation, axis=0)
+    limit = numpy.maximum(max_deviation * mad, tolerance * median)
+    kept = captures[(deviation <= limit).all(axis=1)]
+    if not len(kept):
+        kept = captures
+
+    trimmed = numpy.sort(kept, axis=0)
+    cut = int(len(trimmed) * trim)
+    if cut and len(trimmed) > 2 * cut:
+        trimmed = trimmed[cut:-cut]
+
+    return GroupStats(
+        length=captures.shape[1],
+        count=len(captures),
+        kept=len(kept),
+        mean=trimmed.mean(axis=0),
+        median=numpy.median(kept, axis=0),
+        variance=kept.var(axis=0),
+    )
+
+
+def compute_stats(filepath, trim=0.1, max_deviation=3.0, tolerance=0.1):
+    """
+    return the stats of each frame length, most frequent first
+    """
+    stats = [
+        group_stats(group.captures, trim, max_deviation, tolerance)
+        for group in read_groups(filepath).values()
+    ]
+    return sorted(stats, key=lambda group: group.count, reverse=True)
+
+
+def compute_avg(filepath, trim=0.1, max_deviation=3.0, tolerance=0.1):
+    """
+    return the average frame of the most frequent frame length
+    """
+    stats = compute_stats(filepath, trim, max_deviation, tolerance)
+    if not stats:
+        return []
+    return [int(value) for value in stats[0].mean]
 
 
 parser = argparse.ArgumentParser()
 parser.add_argument("-f", "--filepath", type=pathlib.Path)
+parser.add_argument("-t", "--trim", type=float, default=0.1)
+parser.add_argument("-d", "--max-deviation", type=float, default=3.0)
+parser.add_argument("-r", "--tolerance", type=float, default=0.1)
+parser.add_argument("-a", "--all", action="store_true", help="show all frame lengths")
 if __name__ == "__main__":
     args = parser.parse_args()
-    print(compute_avg(args.filepath))
+    stats = compute_stats(args.filepath, args.trim, args.max_deviation, args.tolerance)
+    for group in stats if args.all else stats[:1]:
+        print(f"length {group.length}: {group.kept}/{group.count} captures kept")
+        print("mean", [int(value) for value in group.mean])
+        print("median", [int(value) for value in group.median])
+        print("std", [round(float(value), 1) for value in numpy.sqrt(group.variance)])
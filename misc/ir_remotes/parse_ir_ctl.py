@@ -1,5 +1,43 @@
+"""
+Streaming pipeline from ir-ctl captures to config entries:
+
+    source -> parse_line -> protocol detection -> decode -> repeat dedupe -> TOML
+
+Every stage is a generator, so lines are pulled one at a time: when decoding
+falls behind, ir-ctl blocks on its stdout pipe instead of buffering in memory.
+"""
+import argparse
+import pathlib
 import re
 import subprocess
+import sys
+from collections import namedtuple
+
+
+IR_REMOTES_DIR = (
+    pathlib.Path(__file__).parents[2] / "keybow" / "lib" / "src" / "ir_remotes"
+)
+sys.path.insert(0, str(IR_REMOTES_DIR))
+
+from encoders.lumene import LUMENE, LUMENE_UNIT, pulses_to_lumene_code  # noqa: E402
+from encoders.nec import (  # noqa: E402
+    NEC32,
+    NEC_BIT_1_SPACE,
+    NEC_HEADER_PULSE,
+    NEC_UNIT,
+    NECX,
+    nec_scancode_to_pulses,
+)
+from encoders.nec import NEC as NEC_PROTOCOL  # noqa: E402
+from encoders.nec import pulses_to_scancode as nec_pulses_to_scancode  # noqa: E402
+from encoders.rc5 import RC5, RC5_UNIT  # noqa: E402
+from encoders.rc5 import pulses_to_scancode as rc5_pulses_to_scancode  # noqa: E402
+from encoders.utils import eq_margin, parse_ir_ctl_string  # noqa: E402
+
+
+NEC = "nec"
+NEC_VARIANTS = {"nec": NEC_PROTOCOL, "nec-x": NECX, "nec-32": NEC32}
+Frame = namedtuple("Frame", ["protocol", "variant", "scancode", "pulses"])
 
 
 def parse_line(line: str):
@@ -13,14 +51,173 @@ def parse_line(line: str):
     return " ".join(pulses)
 
 
-def run_ir_ctl():
+def ir_ctl_source(device="/dev/lirc1"):
     proc = subprocess.Popen(
-        "ir-ctl -d /dev/lirc1 -r", shell=True, stdout=subprocess.PIPE
+        ["ir-ctl", "-d", device, "-r"], stdout=subprocess.PIPE, text=True
     )
     try:
-        for line in iter(proc.stdout.readline, ""):
-            pulses = parse_line(line.decode())
+        yield from proc.stdout
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def replay_source(filepaths):
+    """
+    Replay saved ir-ctl outputs, so the pipeline runs without hardware
+    """
+    for filepath in filepaths:
+        with open(filepath) as input_file:
+            yield from input_file
+
+
+def parse_lines(lines):
+    for line in lines:
+        pulses = parse_line(line)
+        if pulses is not None:
+            yield parse_ir_ctl_string(pulses)
+
+
+def detect_protocol(pulses):
+    first = pulses[0]
+    if eq_margin(first, NEC_HEADER_PULSE, 4 * NEC_UNIT):
+        return NEC
+
+    if len(pulses) in (63, 64) and any(
+        eq_margin(first, length, LUMENE_UNIT / 2)
+        for length in (LUMENE_UNIT, 3 * LUMENE_UNIT)
+    ):
+        return LUMENE
+
+    if len(pulses) < 28 and any(
+        eq_margin(first, length, RC5_UNIT / 2) for length in (RC5_UNIT, 2 * RC5_UNIT)
+    ):
+        return RC5
+
+    return None
+
+
+def _nec_bits(pulses):
+    return [eq_margin(space, NEC_BIT_1_SPACE, NEC_UNIT / 2) for space in pulses[3:-1:2]]
+
+
+def nec_variant(pulses, scancode):
+    """
+    The variant whose encoding of the scancode gives back the captured bits
+    """
+    bits = _nec_bits(pulses)
+    for variant, protocol in NEC_VARIANTS.items():
+        if _nec_bits(nec_scancode_to_pulses(scancode, protocol)) == bits:
+            return variant
+    return None
+
+
+def decode_pulses(pulses, protocol):
+    if protocol == NEC:
+        scancode = nec_pulses_to_scancode(pulses)
+        return nec_variant(pulses, scancode), scancode
+
+    if protocol == RC5:
+        address, command = rc5_pulses_to_scancode(pulses)
+        return None, int.from_bytes(address + command, "big")
+
+    if protocol == LUMENE:
+        return None, int(pulses_to_lumene_code(pulses), 16)
+
+    raise ValueError(f"unknown protocol {protocol}")
+
+
+def decode(frames):
+    """
+    Frames that cannot be decoded are kept, with a None scancode
+    """
+    for pulses in frames:
+        protocol = detect_protocol(pulses)
+        try:
+            variant, scancode = decode_pulses(pulses, protocol)
+        except Exception:
+            variant, scancode = None, None
+
+        yield Frame(protocol, variant, scancode, pulses)
+
+
+def dedupe(frames):
+    """
+    Drop repeated frames of already known scancodes (held keys)
+    """
+    seen = set()
+    for frame in frames:
+        if frame.scancode is None:
+            yield frame
+            continue
+
+        key = (frame.protocol, frame.scancode)
+        if key not in seen:
+            seen.add(key)
+            yield frame
+
+
+def emit_toml(frames, output, name="capture"):
+    """
+    Write config entries as soon as they are decoded.
+    A new [[protocols]] section is started whenever the protocol changes.
+    """
+    section = None
+    sections = 0
+    for frame in frames:
+        if frame.scancode is None:
+            raw = " ".join(
+                f"{'+' if idx % 2 == 0 else '-'}{pulse}"
+                for idx, pulse in enumerate(frame.pulses)
+            )
+            output.write(f"# undecoded ({frame.protocol}): {raw}\n")
+
+        else:
+            if (frame.protocol, frame.variant) != section:
+                section = (frame.protocol, frame.variant)
+                sections += 1
+                output.write(f'\n[[protocols]]\nname = "{name} {sections}"\n')
+                output.write(f'protocol = "{frame.protocol}"\n')
+                if frame.variant:
+                    output.write(f'variant = "{frame.variant}"\n')
+                output.write("\n[protocols.scancodes]\n")
+
+            output.write(f'{hex(frame.scancode)} = "KEY_UNKNOWN"\n')
+
+        output.flush()
+        yield frame
+
+
+def pipeline(lines, output, name="capture"):
+    return emit_toml(dedupe(decode(parse_lines(lines))), output, name)
+
+
+def run_ir_ctl(device="/dev/lirc1"):
+    try:
+        for line in ir_ctl_source(device):
+            pulses = parse_line(line)
             if pulses is not None:
                 print(pulses)
     except KeyboardInterrupt:
         return
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-d", "--device", default="/dev/lirc1")
+parser.add_argument(
+    "-r", "--replay", type=pathlib.Path, nargs="+", help="saved ir-ctl outputs"
+)
+parser.add_argument("-o", "--output", type=pathlib.Path, help="defaults to stdout")
+parser.add_argument("-n", "--name", default="capture", help="remote name")
+if __name__ == "__main__":
+    args = parser.parse_args()
+    lines = replay_source(args.replay) if args.replay else ir_ctl_source(args.device)
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for _ in pipeline(lines, output, args.name):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.output:
+            output.close()
@@ -0,0 +1,7 @@
+import pathlib
+import sys
+
+
+ROOT_DIR = pathlib.Path(__file__).parents[1]
+# keybow code, and fakes of the CircuitPython modules it needs
+sys.path[:0] = [str(ROOT_DIR / "keybow" / "lib"), str(ROOT_DIR / "misc" / "fakes")]
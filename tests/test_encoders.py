@@ -0,0 +1,64 @@
+import pytest
+from src.ir_remotes.encoders.lumene import (
+    LUMENE_BIT_0,
+    LUMENE_BIT_1,
+    LUMENE_NBITS,
+    pulses_to_lumene_code,
+)
+from src.ir_remotes.encoders.nec import NEC, nec_scancode_to_pulses, pulses_to_scancode
+from src.ir_remotes.encoders.utils import (
+    IRDecodeException,
+    decode_bits,
+    find_lengths,
+    generate_pulses,
+    parse_ir_ctl_string,
+)
+
+
+# KEY_DOWN of misc/ir_remotes/config/lumene.toml, with two 485/488 marks
+LUMENE_DOWN = parse_ir_ctl_string(
+    "+1255 -403 +1264 -404 +1265 -404 +1262 -405 +428 -1237 +432 -1234 +432 -1233 "
+    "+434 -1236 +432 -1233 +1269 -400 +434 -1233 +485 -1179 +438 -1230 +427 -1235 "
+    "+432 -1235 +1267 -404 +1263 -405 +1264 -404 +1262 -406 +437 -1229 +1263 -405 "
+    "+1262 -407 +1263 -404 +488 -1181 +436 -1231 +436 -1227 +430 -1237 +1265 -402 "
+    "+1265 -403 +1266 -402 +1264 -404 +1265"
+)
+
+
+def test_find_lengths_clusters_real_captures():
+    assert find_lengths(LUMENE_DOWN) == {421: 31, 1246: 32}
+
+
+def test_find_lengths_counts_outliers_apart():
+    header = [9000, 4500]
+    assert find_lengths(header + [560] * 10 + [1690] * 6 + [565, 555]) == {
+        560: 12,
+        1690: 6,
+        4500: 1,
+        9000: 1,
+    }
+
+
+def test_find_lengths_tolerance():
+    assert find_lengths([100, 110, 120], tolerance=0.1) == {105: 2, 120: 1}
+    assert find_lengths([100, 110, 120], tolerance=0.2) == {110: 3}
+    assert find_lengths([]) == {}
+
+
+def test_decode_real_lumene_capture():
+    assert pulses_to_lumene_code(LUMENE_DOWN) == "0xfbe11e0"
+
+
+def test_decode_generated_lumene_pulses():
+    pulses = generate_pulses(LUMENE_BIT_1, LUMENE_BIT_0, LUMENE_NBITS, 0xFBE11E0)
+    assert pulses_to_lumene_code(pulses) == "0xfbe11e0"
+
+
+def test_decode_nec_pulses():
+    pulses = list(nec_scancode_to_pulses(0x1234, NEC))
+    assert pulses_to_scancode(pulses) == 0x1234
+
+
+def test_decode_bits_without_repeated_length():
+    with pytest.raises(IRDecodeException):
+        decode_bits([400, 1200, 2400, 4800], has_trail=False)
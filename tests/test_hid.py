@@ -0,0 +1,122 @@
+import pytest
+from src.hid import ConsumerControlReport, KeyboardReport
+
+
+MUTE = 0xE2
+VOLUME_DOWN = 0xEA
+VOLUME_UP = 0xE9
+A, B = 4, 5
+
+
+class FakeKeyboard:
+    def __init__(self):
+        self.sent = []
+
+    def press(self, *keycodes):
+        self.sent.append(("press", frozenset(keycodes)))
+
+    def release(self, *keycodes):
+        self.sent.append(("release", frozenset(keycodes)))
+
+    def release_all(self):
+        self.sent.append(("release_all",))
+
+
+class FakeConsumerControl:
+    def __init__(self):
+        self.sent = []
+
+    def press(self, code):
+        self.sent.append(("press", code))
+
+    def release(self):
+        self.sent.append(("release",))
+
+
+@pytest.fixture
+def keyboard_report():
+    return KeyboardReport(FakeKeyboard())
+
+
+@pytest.fixture
+def consumer_report():
+    return ConsumerControlReport(FakeConsumerControl())
+
+
+def test_keyboard_sends_changes_only(keyboard_report):
+    keyboard_report.update(frozenset({A}))
+    keyboard_report.update(frozenset({A}))
+    keyboard_report.update(frozenset({A, B}))
+    keyboard_report.update(frozenset({B}))
+    keyboard_report.update(frozenset())
+    keyboard_report.release_all()
+
+    assert keyboard_report.keyboard.sent == [
+        ("press", {A}),
+        ("press", {B}),
+        ("release", {A}),
+        ("release", {B}),
+    ]
+
+
+def test_consumer_press_and_release(consumer_report):
+    consumer_report.update([MUTE])
+    consumer_report.update([MUTE])
+    consumer_report.update([])
+    consumer_report.update([])
+
+    assert consumer_report.consumer_control.sent == [("press", MUTE), ("release",)]
+
+
+def test_consumer_overlap_does_not_press_a_held_code_again(consumer_report):
+    consumer_report.update([MUTE])
+    consumer_report.update([MUTE, VOLUME_DOWN])
+    # releasing the last code releases the report, mute is not sent twice
+    consumer_report.update([MUTE])
+    consumer_report.update([])
+
+    assert consumer_report.consumer_control.sent == [
+        ("press", MUTE),
+        ("press", VOLUME_DOWN),
+        ("release",),
+    ]
+
+
+def test_consumer_release_of_an_older_code_keeps_the_report(consumer_report):
+    consumer_report.update([MUTE])
+    consumer_report.update([MUTE, VOLUME_DOWN])
+    consumer_report.update([VOLUME_DOWN])
+    consumer_report.update([])
+
+    assert consumer_report.consumer_control.sent == [
+        ("press", MUTE),
+        ("press", VOLUME_DOWN),
+        ("release",),
+    ]
+
+
+def test_consumer_codes_pressed_together_are_sent_in_turn(consumer_report):
+    consumer_report.update([VOLUME_UP, MUTE])
+    consumer_report.release_all()
+    consumer_report.release_all()
+
+    assert consumer_report.consumer_control.sent == [
+        ("press", VOLUME_UP),
+        ("press", MUTE),
+        ("release",),
+    ]
+
+
+def test_consumer_macro_codes_are_tracked_apart(consumer_report):
+    consumer_report.update([MUTE])
+    consumer_report.press(VOLUME_UP)
+    consumer_report.update([])
+    # the macro still holds its code
+    assert consumer_report.codes == [VOLUME_UP]
+    consumer_report.release()
+
+    assert consumer_report.consumer_control.sent == [
+        ("press", MUTE),
+        ("press", VOLUME_UP),
+        ("release",),
+    ]
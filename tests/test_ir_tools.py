@@ -0,0 +1,133 @@
+import pathlib
+import sys
+
+import pytest
+
+
+numpy = pytest.importorskip("numpy")
+# capture tools of misc/ir_remotes, they import the encoders as a top-level package
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1] / "misc" / "ir_remotes"))
+
+import batch_decode  # noqa: E402
+import compute_avg  # noqa: E402
+from encoders.lumene import LUMENE_BIT_0, LUMENE_BIT_1, LUMENE_NBITS  # noqa: E402
+from encoders.nec import (  # noqa: E402
+    NEC,
+    NEC_BIT_0_SPACE,
+    NEC_BIT_1_SPACE,
+    NEC_BIT_PULSE,
+    NEC_HEADER_PULSE,
+    NEC_HEADER_SPACE,
+    NEC_NBITS,
+    NEC_TRAILER_PULSE,
+    NECX,
+    nec_scancode_to_bits,
+)
+from encoders.utils import IRValue, generate_pulses  # noqa: E402
+
+
+def nec_pulses(code, protocol=NEC):
+    return generate_pulses(
+        one=IRValue(NEC_BIT_PULSE, NEC_BIT_1_SPACE),
+        zero=IRValue(NEC_BIT_PULSE, NEC_BIT_0_SPACE),
+        nbits=NEC_NBITS,
+        data=nec_scancode_to_bits(code, protocol),
+        header=IRValue(NEC_HEADER_PULSE, NEC_HEADER_SPACE),
+        msb=False,
+        trailer=NEC_TRAILER_PULSE,
+    )
+
+
+def lumene_pulses(code):
+    return generate_pulses(
+        one=LUMENE_BIT_1, zero=LUMENE_BIT_0, nbits=LUMENE_NBITS, data=code
+    )
+
+
+def jitter(pulses, seed):
+    rng = numpy.random.default_rng(seed)
+    return [pulse + int(rng.integers(-40, 41)) for pulse in pulses]
+
+
+def test_group_stats_tolerates_quantized_timings():
+    captures = numpy.array([[9000, 4500, 550, 1650]] * 20)
+    # one quantum off, the MAD of the position stays 0
+    captures[::4, 2] += 50
+    captures[0, 1] = 2000
+
+    stats = compute_avg.group_stats(captures, trim=0.0)
+    assert (stats.count, stats.kept) == (20, 19)
+    assert list(stats.median) == [9000, 4500, 550, 1650]
+
+    strict = compute_avg.group_stats(captures, trim=0.0, tolerance=0.0)
+    assert strict.kept == 15
+
+
+def test_group_stats_rejects_beyond_the_mad():
+    rng = numpy.random.default_rng(0)
+    captures = 1000 + rng.integers(-100, 101, size=(50, 3))
+    captures[7, 1] = 1600
+
+    stats = compute_avg.group_stats(captures, trim=0.0, tolerance=0.0)
+    assert stats.kept == 49
+    assert abs(stats.mean[1] - 1000) < 30
+
+
+def test_group_stats_trimmed_mean():
+    captures = numpy.array([[100], [101], [102], [103], [104], [105], [106], [107]])
+    captures[-1] = 140
+
+    stats = compute_avg.group_stats(captures, trim=0.125, max_deviation=100)
+    assert stats.kept == 8
+    assert stats.mean[0] == pytest.approx(103.5)
+
+
+def test_compute_stats_groups_by_length(tmp_path):
+    filepath = tmp_path / "captures.txt"
+    filepath.write_text(
+        "+9000 -4500 +560 -1690 +560\n"
+        "+9010 -4490 +565 -1680 +555  # comment\n"
+        "\n"
+        "+9000 -2250 +560\n"
+        "9005 4505 555 1695 565\n"
+    )
+
+    stats = compute_avg.compute_stats(filepath, trim=0.0)
+    assert [(group.length, group.count) for group in stats] == [(5, 3), (3, 1)]
+    assert compute_avg.compute_avg(filepath, trim=0.0) == [9005, 4498, 560, 1688, 560]
+
+
+def test_decode_batch_matches_generate_pulses():
+    codes = [(NEC, 0x0412), (NEC, 0x40BF), (NECX, 0x7F0012)]
+    captures = [
+        jitter(nec_pulses(code, protocol), seed)
+        for seed, (protocol, code) in enumerate(codes)
+    ]
+    captures.append(jitter(lumene_pulses(0xFBE11E0), 10))
+    # the last space of lumene frames is often missing
+    captures.append(lumene_pulses(0xFDE3322)[:-1])
+
+    result = batch_decode.decode_batch(captures)
+    assert [batch_decode.PROTOCOLS[protocol] for protocol in result.protocols] == [
+        NEC,
+        NEC,
+        NEC,
+        "lumene",
+        "lumene",
+    ]
+    assert list(result.scancodes) == [0x0412, 0x40BF, 0x7F0012, 0xFBE11E0, 0xFDE3322]
+    assert not result.errors.any()
+
+
+def test_decode_batch_errors():
+    bad_timing = nec_pulses(0x0412)
+    bad_timing[10] = 1100
+    captures = [bad_timing, nec_pulses(0x0412)[:-2], [5000, 5000, 5000]]
+
+    result = batch_decode.decode_batch(captures)
+    assert [batch_decode.ERRORS[error] for error in result.errors] == [
+        "bad timing",
+        "bad length",
+        "unknown protocol",
+    ]
+    assert not result.scancodes.any()
@@ -0,0 +1,204 @@
+import time
+
+import pytest
+from src.keybow import EventQueue, Keybow
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def keybow(clock):
+    return Keybow()
+
+
+@pytest.fixture
+def debounced_keybow(keybow):
+    # as with the polling backend
+    for key in keybow.keys:
+        key.debounce = 4
+    keybow.update_debounce()
+    return keybow
+
+
+def test_debounce_filters_bounces(debounced_keybow):
+    states = [debounced_keybow.debounce(raw) for raw in (1, 0, 1, 1, 0, 1, 1, 1, 1)]
+    assert states == [0, 0, 0, 0, 0, 0, 0, 0, 1]
+    debounced_keybow.pressed_mask = 1
+
+    states = [debounced_keybow.debounce(raw) for raw in (0, 1, 0, 0, 0, 0)]
+    assert states == [1, 1, 1, 1, 1, 0]
+
+
+def test_debounce_ignores_a_one_read_blip(debounced_keybow):
+    assert [debounced_keybow.debounce(raw) for raw in (0, 0b10, 0, 0, 0, 0)] == [0] * 6
+
+    debounced_keybow.pressed_mask = 0b10
+    assert [debounced_keybow.debounce(raw) for raw in (0b10,) * 4] == [0b10] * 4
+    assert debounced_keybow.debounce(0) == 0b10
+    assert debounced_keybow.debounce(0b10) == 0b10
+
+
+def test_debounce_per_key(debounced_keybow):
+    debounced_keybow.set_debounce(5, 1)
+    assert debounced_keybow.debounce(0b100001) == 0b100000
+    debounced_keybow.pressed_mask = 0b100000
+    assert debounced_keybow.debounce(0b1) == 0
+
+
+def edges(keybow, pressed, now):
+    newly_pressed, held, released, hold_released, tapped = keybow.update_masks(
+        pressed, now
+    )
+    return {
+        "pressed": newly_pressed,
+        "held": held,
+        "released": released,
+        "hold_released": hold_released,
+        "tapped": tapped,
+    }
+
+
+def test_tap(keybow):
+    assert edges(keybow, 0b1000, 0.0)["pressed"] == 0b1000
+    assert not any(edges(keybow, 0b1000, 0.05).values())
+
+    released = edges(keybow, 0, 0.08)
+    assert released["released"] == released["tapped"] == 0b1000
+    assert not released["hold_released"]
+    assert not any(edges(keybow, 0, 0.1).values())
+
+
+def test_hold_and_hold_released(keybow):
+    edges(keybow, 0b1000, 0.0)
+    assert edges(keybow, 0b1000, 0.2)["held"] == 0b1000
+    # held is an edge, the state stays in held_mask
+    assert not any(edges(keybow, 0b1000, 0.3).values())
+    assert keybow.held_mask == 0b1000
+
+    released = edges(keybow, 0, 0.4)
+    assert released["released"] == released["hold_released"] == 0b1000
+    assert not released["tapped"]
+    assert not keybow.held_mask
+
+
+def test_only_changed_keys_have_edges(keybow):
+    edges(keybow, 0b01, 0.0)
+    assert edges(keybow, 0b11, 0.05) == {
+        "pressed": 0b10,
+        "held": 0,
+        "released": 0,
+        "hold_released": 0,
+        "tapped": 0,
+    }
+    assert edges(keybow, 0b11, 0.12)["held"] == 0b01
+    assert edges(keybow, 0b10, 0.13)["hold_released"] == 0b01
+
+
+def test_update_dispatches_events(keybow, clock):
+    cursor = keybow.events.head
+    keybow.scanner.keys.press(2)
+    keybow.update()
+    clock.now += 0.5
+    keybow.update()
+    keybow.scanner.keys.release(2)
+    keybow.update()
+
+    events, cursor = keybow.events.read(cursor)
+    assert [(key_idx, event) for key_idx, event, _ in events] == [
+        (2, "pressed"),
+        (2, "held"),
+        (2, "released"),
+        (2, "hold_released"),
+    ]
+    assert events[1][2] - events[0][2] == 500
+    assert keybow.events.read(cursor) == ((), cursor)
+
+
+def test_event_queue_cursor_wraps_around():
+    queue = EventQueue(size=4)
+    cursor = 0
+    for idx in range(3):
+        queue.push(idx, 0, idx)
+    events, cursor = queue.read(cursor)
+    assert [key_idx for key_idx, _, _ in events] == [0, 1, 2]
+
+    for idx in range(3, 6):
+        queue.push(idx, 2, idx)
+    events, cursor = queue.read(cursor)
+    assert events == [(3, "released", 3), (4, "released", 4), (5, "released", 5)]
+    assert cursor == queue.head == 6
+
+
+def test_event_queue_overflow_keeps_the_last_events():
+    queue = EventQueue(size=4)
+    for idx in range(10):
+        queue.push(idx, 0, 2**32 - 1)
+    events, cursor = queue.read(0)
+    assert [key_idx for key_idx, _, _ in events] == [6, 7, 8, 9]
+    assert events[0][2] == 2**32 - 1
+    assert cursor == 10
+
+
+def test_debouncing(keybow):
+    keybow.set_debounce(3, 2)
+    assert not keybow.debouncing
+
+    keybow.scanner.keys.press(3)
+    keybow.update()
+    assert keybow.debouncing
+    assert not keybow.pressed_mask
+
+    keybow.update()
+    assert not keybow.debouncing
+    assert keybow.pressed_mask == 0b1000
+
+
+def test_resume_reports_the_waking_key(keybow, clock):
+    pins = keybow.suspend()
+    keybow.resume(pins[3])
+    events = []
+    keybow.on_event(3, "tapped")(events.append)
+
+    # the keypad backend did not scan yet
+    keybow.update()
+    assert keybow.pressed_mask == 0b1000
+    clock.now += 0.01
+    keybow.update()
+    assert keybow.pressed_mask == 0b1000
+
+    keybow.scanner.keys.press(3)
+    clock.now += 0.01
+    keybow.update()
+    assert keybow.pressed_mask == 0b1000
+    assert not events
+
+    keybow.scanner.keys.release(3)
+    clock.now += 0.01
+    keybow.update()
+    assert not keybow.pressed_mask
+    assert len(events) == 1
+
+
+def test_resume_releases_a_key_released_before_the_first_scan(keybow, clock):
+    pins = keybow.suspend()
+    keybow.resume(pins[3])
+
+    keybow.update()
+    assert keybow.pressed_mask == 0b1000
+    clock.now += 0.05
+    keybow.update()
+    assert not keybow.pressed_mask
+    assert keybow.tapped_mask == 0b1000
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+from src.hid import get_report
+from src.macro import MacroRunner, compile_steps, delay, press, release, tap
+
+from test_hid import FakeKeyboard
+
+
+SHIFT, A, B = 225, 4, 5
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def keyboard():
+    return FakeKeyboard()
+
+
+def run(runner, clock, duration, period=0.01):
+    end = clock.now + duration
+    while clock.now < end:
+        runner.step()
+        clock.now += period
+
+
+def test_steps_go_through_the_shared_report(keyboard, clock):
+    report = get_report(keyboard)
+    runner = MacroRunner()
+    # shift held by a layer key
+    report.update(frozenset({SHIFT}))
+    runner.start(compile_steps([tap(SHIFT), tap(A)], keyboard))
+    run(runner, clock, 0.1)
+
+    assert keyboard.sent == [("press", {SHIFT}), ("press", {A}), ("release", {A})]
+    assert report.keycodes == {SHIFT}
+
+    report.update(frozenset())
+    assert keyboard.sent[-1] == ("release", {SHIFT})
+
+
+def test_layer_update_keeps_macro_keys(keyboard, clock):
+    report = get_report(keyboard)
+    runner = MacroRunner()
+    runner.start(compile_steps([press(SHIFT), delay(0.1), release(SHIFT)], keyboard))
+    runner.step()
+    report.update(frozenset({B}))
+    report.update(frozenset())
+    assert report.keycodes == {SHIFT}
+
+    run(runner, clock, 0.2)
+    assert not report.keycodes
+    assert keyboard.sent == [
+        ("press", {SHIFT}),
+        ("press", {B}),
+        ("release", {B}),
+        ("release", {SHIFT}),
+    ]
+
+
+def test_trailing_delay_holds_back_the_next_macro(keyboard, clock):
+    runner = MacroRunner()
+    runner.start(compile_steps([tap(A), delay(0.2)], keyboard))
+    runner.start(compile_steps([tap(B)], keyboard))
+
+    run(runner, clock, 0.15)
+    assert keyboard.sent == [("press", {A}), ("release", {A})]
+    assert len(runner) == 2
+
+    run(runner, clock, 0.1)
+    assert keyboard.sent[2:] == [("press", {B}), ("release", {B})]
+    assert not len(runner)
+
+
+def test_macro_ends_after_its_last_step(keyboard, clock):
+    runner = MacroRunner()
+    runner.start(compile_steps([tap(A)], keyboard))
+    runner.step()
+    assert len(runner) == 1
+    runner.step()
+    assert not len(runner)
+
+    runner.start(compile_steps([delay(0.1)], keyboard))
+    runner.step()
+    runner.clear()
+    runner.start(compile_steps([tap(B)], keyboard))
+    runner.step()
+    assert keyboard.sent[-1] == ("press", {B})
@@ -0,0 +1,11 @@
+from src.profiler import PhaseTimer
+
+
+def test_phase_timer_keeps_the_last_samples():
+    timer = PhaseTimer("loop", size=8)
+    for duration in range(20):
+        timer.add(duration)
+
+    assert sorted(timer.values) == list(range(12, 20))
+    assert timer.worst == 19
+    assert timer.summary() == "loop 15/19/19"
@@ -0,0 +1,48 @@
+import pytest
+from src.scanner import KeypadScanner
+
+
+@pytest.fixture
+def scanner():
+    return KeypadScanner(tuple(range(16)))
+
+
+def test_press_and_release(scanner):
+    scanner.keys.press(3)
+    assert scanner.read() == 0b1000
+    assert scanner.is_pressed(3)
+    assert scanner.read() == 0b1000
+
+    scanner.keys.release(3)
+    assert scanner.read() == 0
+    assert not scanner.is_pressed(3)
+
+
+def test_short_tap_is_reported_for_one_read(scanner):
+    scanner.keys.press(3)
+    scanner.keys.release(3)
+    assert scanner.read() == 0b1000
+    assert scanner.read() == 0
+
+
+def test_pressed_again_within_a_read_stays_pressed(scanner):
+    scanner.keys.press(3)
+    scanner.keys.release(3)
+    scanner.keys.press(3)
+    assert scanner.read() == 0b1000
+    assert scanner.read() == 0b1000
+
+    scanner.keys.release(3)
+    assert scanner.read() == 0
+
+
+def test_overflow_reports_held_keys_again(scanner):
+    scanner.keys.press(1)
+    for _ in range(40):
+        scanner.keys.press(2)
+        scanner.keys.release(2)
+    assert scanner.keys.events.overflowed
+
+    assert scanner.read() == 0
+    assert not scanner.keys.events.overflowed
+    assert scanner.read() == 0b10